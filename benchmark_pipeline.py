@@ -0,0 +1,382 @@
+"""
+Benchmark the dashboard pipeline stages at increasing ecosystem sizes.
+
+Each tier starts mock_api_server.py in a child process with a synthetic ecosystem of
+N servers and runs the notebook cells in one shared namespace, as Hex does. Per stage
+it records the fastest wall time of --repeats runs, peak RSS and Python allocations
+(tracemalloc, measured in a separate run so tracing overhead does not skew the timings):
+
+    registry      Cell 2  - fetch + parse every registry page
+    discovery     Cell 3  - GitHub search
+    merge         Cell 5  - merge and dedupe
+    join          Cell 9  - join metrics and downloads
+    derived       Cell 10 - health scores and categories
+    kpis          Cell 11 - ecosystem KPIs
+    table_filter  Cell 13 - server table with filters applied
+
+Cells 4 and 6-8 run untimed: Cell 4 is static data and the GitHub / download metrics
+of Cells 6-8 are generated straight from the synthetic ecosystem, since fetching them
+measures the rate limiter rather than the pipeline.
+
+Usage:
+    python benchmark_pipeline.py                                   # 1k, 10k, 100k
+    python benchmark_pipeline.py --tiers 1000 10000 --save-baseline
+    python benchmark_pipeline.py --tiers 1000 10000 --baseline benchmarks/baseline.json --threshold 0.5
+
+Exits non-zero when a stage is slower than the baseline by more than the threshold,
+scales worse than --max-exponent between tiers (time ~ N^k), or when there is no
+baseline to compare against. A baseline recorded on another machine is compared for
+information only. benchmarks/baseline.json holds the 1k and 10k tiers.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from mock_api_server import MockOptions, SyntheticEcosystem, start_mock_servers
+
+CELLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cells")
+DEFAULT_TIERS = [1000, 10000, 100000]
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+DEFAULT_OUTPUT = "benchmarks/results.json"
+
+STAGES = [
+    ("registry", "02_fetch_mcp_registry"),
+    ("discovery", "03_github_discovery"),
+    ("merge", "05_merge_and_dedupe"),
+    ("join", "09_join_all_data"),
+    ("derived", "10_derived_metrics"),
+    ("kpis", "11_ecosystem_kpis"),
+    ("table_filter", "13_viz_page2_server_table"),
+]
+
+# Values for the Hex input components in Cell 13, so the filter paths actually run
+HEX_INPUTS = {
+    "selected_activity": "Active",
+    "selected_tier": "All",
+    "selected_ecosystem": "Python",
+    "selected_source": "mcp_registry",
+    "search_text": "data",
+}
+
+# On a 1-CPU machine, the fastest of 3 runs of an unchanged tree moved by up to 0.11s on
+# sub-second stages and by up to 35% on the slowest one (Cell 10 at 10k) between runs.
+# Slowdowns within those margins are not flagged.
+MIN_REGRESSION_SECONDS = 0.25
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_REPEATS = 3
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS counter (Linux only); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb() -> float:
+    """Peak RSS since the last reset (VmHWM), falling back to the process lifetime peak."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure(fn: Callable, allocations: bool = True, repeats: int = DEFAULT_REPEATS) -> Dict:
+    """Run fn `repeats` times for the fastest wall time and peak RSS, then under tracemalloc for allocations."""
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        per_stage_rss = _reset_peak_rss()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    result = {
+        # The fastest run is the one least disturbed by the rest of the machine
+        "seconds": round(min(times), 4),
+        "seconds_median": round(statistics.median(times), 4),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_rss_scope": "stage" if per_stage_rss else "process",
+    }
+
+    if allocations:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["alloc_peak_mb"] = round(peak / 2**20, 2)
+        result["alloc_retained_mb"] = round(current / 2**20, 2)
+    return result
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def load_cell(name: str) -> str:
+    with open(os.path.join(CELLS_DIR, f"{name}.py")) as f:
+        source = f.read()
+    if name.startswith("13_"):
+        for var, value in HEX_INPUTS.items():
+            source = re.sub(rf"^{var} = .*# Hex (text )?input component$", f"{var} = {value!r}", source, flags=re.M)
+    return source
+
+def run_cell(ns: Dict, name: str, verbose: bool = False):
+    code = compile(load_cell(name), name, "exec")
+    if verbose:
+        exec(code, ns)
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(code, ns)
+
+def synthetic_github_metrics(ecosystem: SyntheticEcosystem, servers: pd.DataFrame) -> pd.DataFrame:
+    """Cell 6's output for the synthetic repos, without going through the API."""
+    rows = []
+    for server_id, url in zip(servers["server_id"], servers["repository"].fillna("")):
+        match = re.search(r"github\.com/([^/]+)/([^/]+)", url)
+        i = ecosystem.repo_index(*match.groups()) if match else None
+        if i is None:
+            rows.append({"server_id": server_id, "has_github": False})
+            continue
+        repo = ecosystem.repo(i)
+        weeks = ecosystem.commit_weeks(i)
+        rows.append({
+            "github_stars": repo["stargazers_count"],
+            "github_forks": repo["forks_count"],
+            "github_watchers": repo["watchers_count"],
+            "github_open_issues": repo["open_issues_count"],
+            "github_size_kb": repo["size"],
+            "github_language": repo["language"],
+            "github_license": (repo["license"] or {}).get("spdx_id"),
+            "github_default_branch": repo["default_branch"],
+            "github_created_at": repo["created_at"],
+            "github_updated_at": repo["updated_at"],
+            "github_pushed_at": repo["pushed_at"],
+            "github_archived": repo["archived"],
+            "github_disabled": repo["disabled"],
+            "github_topics": ",".join(repo["topics"]),
+            "github_contributors": ecosystem.server(i)["contributors"],
+            "commits_last_week": weeks[-1]["total"],
+            "commits_last_4_weeks": sum(w["total"] for w in weeks[-4:]),
+            "server_id": server_id,
+            "has_github": True,
+            "github_owner": repo["owner"]["login"],
+            "github_repo": repo["name"],
+        })
+    return pd.DataFrame(rows)
+
+def synthetic_download_stats(ecosystem: SyntheticEcosystem, servers: pd.DataFrame) -> Dict:
+    """Cell 7 and 8 summary outputs (npm_weekly, npm_summary_df, pypi_summary_df)."""
+    today = ecosystem.now.date()
+    days = [today - timedelta(days=n) for n in range(90, 0, -1)]
+
+    npm_packages = sorted({"@modelcontextprotocol/sdk", *servers["npm_package"].dropna()})
+    npm_weekly, npm_rows = {}, []
+    for pkg in npm_packages:
+        daily = [ecosystem.downloads(pkg, d) for d in days]
+        npm_weekly[pkg] = sum(daily[-7:])
+        npm_rows.append({
+            "package_name": pkg, "package_type": "npm", "downloads_last_week": npm_weekly[pkg],
+            "downloads_30d": sum(daily[-30:]), "downloads_90d": sum(daily), "avg_daily_downloads": sum(daily) / len(daily),
+        })
+
+    pypi_rows = []
+    for pkg in sorted({"mcp", *servers["pypi_package"].dropna()}):
+        daily = [ecosystem.downloads(pkg, d) for d in days[-30:]]
+        pypi_rows.append({
+            "package_name": pkg, "package_type": "pypi", "downloads_last_day": daily[-1],
+            "downloads_last_week": sum(daily[-7:]), "downloads_last_month": sum(daily),
+        })
+    return {
+        "npm_weekly": npm_weekly,
+        "npm_summary_df": pd.DataFrame(npm_rows),
+        "pypi_summary_df": pd.DataFrame(pypi_rows),
+    }
+
+def _serve_mock_apis(size: int, queue):
+    """Child process: serve the mock APIs until terminated, reporting their base URLs."""
+    # Sharded discovery pages through every search result; lift the search limits so the
+    # stage measures the crawl rather than the search API's per-minute pacing
+    options = MockOptions(stats_pending_rate=0, search_limit=10**6, anonymous_search_limit=10**6)
+    servers, env = start_mock_servers(size, port=0, options=options)
+    servers[1].RequestHandlerClass.ecosystem.search_index()
+    queue.put(env)
+    threading.Event().wait()
+
+def run_tier(size: int, allocations: bool = True, verbose: bool = False,
+             repeats: int = DEFAULT_REPEATS) -> Dict[str, Dict]:
+    """Run every stage against an ecosystem of `size` servers; returns {stage: measurements}."""
+    # A separate process keeps the server's CPU time and memory out of the measurements
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_mock_apis, args=(size, queue), daemon=True)
+    server.start()
+    os.environ.update(queue.get(timeout=600))
+
+    # Same seed and size as the server, so it describes the same repos
+    ecosystem = SyntheticEcosystem(size)
+    ns = {"display": lambda *args, **kwargs: None, "__name__": "__main__"}
+
+    try:
+        run_cell(ns, "01_config_and_imports", verbose)
+        # Measure the pipeline, not the politeness delays or the on-disk cache
+        ns["HOST_RATE_LIMITS"].clear()
+        ns["HTTP_CACHE_ENABLED"] = False
+        ns["REGISTRY_INCREMENTAL"] = False
+        ns["GITHUB_DISCOVERY_INCREMENTAL"] = False
+        ns["IDENTITY_INDEX_PATH"] = None
+        ns["REGISTRY_MAX_PAGES"] = size // 100 + 1
+
+        results = {}
+        for stage, cell in STAGES:
+            if stage == "merge":
+                run_cell(ns, "04_curated_servers", verbose)
+            if stage == "join":
+                ns["github_metrics_df"] = synthetic_github_metrics(ecosystem, ns["servers_master_df"])
+                ns.update(synthetic_download_stats(ecosystem, ns["servers_master_df"]))
+
+            print(f"  [{size:>7,}] {stage:<13}", end="", flush=True)
+            results[stage] = measure(lambda: run_cell(ns, cell, verbose), allocations, repeats)
+            r = results[stage]
+            print(f"{r['seconds']:>9.3f}s (median {r['seconds_median']:.3f})  rss {r['peak_rss_mb']:>8.1f} MB"
+                  + (f"  alloc {r['alloc_peak_mb']:>8.2f} MB" if allocations else ""))
+        results["_rows"] = {"servers_master_df": len(ns["servers_master_df"])}
+        return results
+    finally:
+        server.terminate()
+        server.join()
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+def scaling_exponents(tiers: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Empirical exponent k in time ~ N^k between consecutive tiers, per stage."""
+    sizes = sorted(int(t) for t in tiers)
+    exponents = {}
+    for small, large in zip(sizes, sizes[1:]):
+        for stage, _ in STAGES:
+            t_small = tiers[str(small)][stage]["seconds"]
+            t_large = tiers[str(large)][stage]["seconds"]
+            if t_small < MIN_REGRESSION_SECONDS or t_large <= 0:
+                continue
+            k = math.log(t_large / t_small) / math.log(large / small)
+            exponents.setdefault(stage, {})[f"{small}->{large}"] = round(k, 2)
+    return exponents
+
+def find_regressions(results: Dict, baseline: Optional[Dict], threshold: float, max_exponent: float) -> List[str]:
+    problems = []
+    if baseline:
+        for tier, stages in results["tiers"].items():
+            for stage, _ in STAGES:
+                old = baseline.get("tiers", {}).get(tier, {}).get(stage)
+                new = stages.get(stage)
+                if not old or not new:
+                    continue
+                if new["seconds"] > old["seconds"] * (1 + threshold) and \
+                        new["seconds"] - old["seconds"] > MIN_REGRESSION_SECONDS:
+                    problems.append(f"{stage} @ {int(tier):,}: {new['seconds']:.3f}s vs baseline "
+                                    f"{old['seconds']:.3f}s (+{new['seconds'] / old['seconds'] - 1:.0%})")
+                if "alloc_peak_mb" in new and old.get("alloc_peak_mb") and \
+                        new["alloc_peak_mb"] > old["alloc_peak_mb"] * (1 + threshold) and \
+                        new["alloc_peak_mb"] - old["alloc_peak_mb"] > 1:
+                    problems.append(f"{stage} @ {int(tier):,}: allocation peak {new['alloc_peak_mb']:.1f} MB "
+                                    f"vs baseline {old['alloc_peak_mb']:.1f} MB")
+
+    for stage, steps in results["scaling"].items():
+        for step, k in steps.items():
+            if k > max_exponent:
+                problems.append(f"{stage} scales as N^{k} between {step} (limit N^{max_exponent})")
+    return problems
+
+def write_json(path: str, payload: Dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages at several ecosystem sizes.")
+    parser.add_argument("--tiers", type=int, nargs="+", default=DEFAULT_TIERS, help="ecosystem sizes to run")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown vs baseline (0.5 = 50%%)")
+    parser.add_argument("--max-exponent", type=float, default=1.3, help="allowed scaling exponent between tiers")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed runs per stage (the fastest is kept)")
+    parser.add_argument("--no-allocations", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--verbose", action="store_true", help="show cell output")
+    args = parser.parse_args()
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "repeats": args.repeats,
+        "tiers": {},
+    }
+    for size in sorted(args.tiers):
+        print(f"\nTier: {size:,} servers")
+        results["tiers"][str(size)] = run_tier(size, not args.no_allocations, args.verbose, args.repeats)
+    results["scaling"] = scaling_exponents(results["tiers"])
+
+    write_json(args.output, results)
+    print(f"\n✓ Results written to {args.output}")
+
+    baseline = None
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"✓ Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        # Without a baseline the regression gate could never fail
+        print(f"\n⚠ No baseline at {args.baseline} - run with --save-baseline to create one")
+        sys.exit(1)
+
+    # Timings from another machine say little about this one: show that comparison, but
+    # only gate on the scaling between this run's own tiers
+    if baseline and baseline.get("machine") != results["machine"]:
+        advisory = find_regressions(results, baseline, args.threshold, math.inf)
+        print(f"\n⚠ Baseline was recorded on {baseline.get('machine')}, this is {results['machine']}; "
+              f"comparison is advisory" + ("" if advisory else " (no differences)"))
+        for problem in advisory:
+            print(f"  {problem}")
+        baseline = None
+
+    problems = find_regressions(results, baseline, args.threshold, args.max_exponent)
+    if problems:
+        print("\n⚠ Performance regressions:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("✓ No regressions" + (f" against {args.baseline}" if baseline else ""))
+
+if __name__ == "__main__":
+    main()
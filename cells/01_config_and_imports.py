@@ -2,55 +2,1024 @@
 # This cell sets up all dependencies and configuration for the MCP Ecosystem Dashboard
 
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
+import os
+import re
+import hashlib
+import gzip
+import random
+import asyncio
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from urllib.parse import quote, urlparse
+from email.utils import parsedate_to_datetime
 
 # ============================================
 # CONFIGURATION
 # ============================================
 
-# API Endpoints
-MCP_REGISTRY_BASE = "https://registry.modelcontextprotocol.io/v0"
-GITHUB_API_BASE = "https://api.github.com"
-NPM_DOWNLOADS_API = "https://api.npmjs.org/downloads"
+# API Endpoints (override via environment variables, e.g. to point at mock_api_server.py)
+MCP_REGISTRY_BASE = os.environ.get("MCP_REGISTRY_BASE", "https://registry.modelcontextprotocol.io/v0")
+GITHUB_API_BASE = os.environ.get("GITHUB_API_BASE", "https://api.github.com")
+NPM_DOWNLOADS_API = os.environ.get("NPM_DOWNLOADS_API", "https://api.npmjs.org/downloads")
+PYPISTATS_API = os.environ.get("PYPISTATS_API", "https://pypistats.org/api")
+
+REGISTRY_HOST = urlparse(MCP_REGISTRY_BASE).netloc.lower()
+GITHUB_HOST = urlparse(GITHUB_API_BASE).netloc.lower()
+NPM_HOST = urlparse(NPM_DOWNLOADS_API).netloc.lower()
+PYPISTATS_HOST = urlparse(PYPISTATS_API).netloc.lower()
+
+# Registry pagination cap (pages of 100 servers)
+REGISTRY_MAX_PAGES = 50
+REGISTRY_PREFETCH_PAGES = 4  # pages fetched ahead of the parser
+REGISTRY_RAW_PAGES_PATH = ".cache/registry/pages.jsonl"  # raw pages of the current crawl (None = off)
+
+# Incremental registry sync: keep a local mirror and only fetch what changed since the last run
+REGISTRY_INCREMENTAL = True
+REGISTRY_MIRROR_PATH = ".cache/registry/mirror.json.gz"
+REGISTRY_CHECKPOINT_PATH = ".cache/registry/checkpoint.json"
+REGISTRY_UPDATED_SINCE_PARAM = "updated_since"  # None if the API has no updated-since filter
+REGISTRY_EARLY_STOP_PAGES = 2  # stop after this many pages of known, unchanged servers (0 = never)
+REGISTRY_FULL_SYNC_DAYS = 7  # full re-crawl interval; drops servers removed from the registry
+
+# Registry detail enrichment: fetch each server's full record for its complete package list.
+# Details are cached in the mirror per server version; concurrency follows HTTP_CONCURRENCY_LIMITS.
+REGISTRY_FETCH_DETAILS = False
+
+# GitHub discovery: page through every search result by splitting each query into
+# created: date ranges small enough for the search API's result cap (False = top 100 per query)
+GITHUB_SEARCH_SHARDING = True
+GITHUB_SEARCH_CREATED_SINCE = "2008-01-01"  # earliest repo creation date searched
+GITHUB_SEARCH_RESULT_CAP = 1000  # results the search API returns per query
+
+# Incremental discovery: keep an index of known repos (repo_id -> last pushed_at) and only
+# search for repos pushed since the last complete run. Requires GITHUB_SEARCH_SHARDING.
+GITHUB_DISCOVERY_INCREMENTAL = True
+GITHUB_DISCOVERY_INDEX_PATH = ".cache/github/discovery.json.gz"
+GITHUB_DISCOVERY_FULL_SYNC_DAYS = 7  # full re-search interval; drops repos that no longer match
+
+# Server identity index: records sharing a repo URL, declared npm/PyPI package or registry id
+# are one server, with a canonical server_id kept across runs (None = rebuild every run)
+IDENTITY_INDEX_PATH = ".cache/identity/index.json.gz"
+IDENTITY_FULL_SYNC_DAYS = 7  # interval for dropping links that no record asserts any more
+
+# Near-duplicate detection for servers without a repo URL: MinHash/LSH over name, description
+# and author. Clusters are reported in near_duplicate_clusters_df and only merged if enabled.
+NEAR_DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity of word bigrams
+NEAR_DUPLICATE_MERGE = False
 
 # GitHub token (set as Hex secret or environment variable)
 # GITHUB_TOKEN = hex_secrets.get("GITHUB_TOKEN", None)  # Uncomment in Hex
 GITHUB_TOKEN = None  # Placeholder - set in Hex secrets
 
-# Rate limiting settings
-GITHUB_RATE_LIMIT_DELAY = 2.5  # seconds between requests (30 req/min unauthenticated)
-NPM_RATE_LIMIT_DELAY = 0.5
+# Extra tokens are pooled with GITHUB_TOKEN; each request goes to the token with the most quota left
+# GITHUB_EXTRA_TOKENS = hex_secrets.get("GITHUB_EXTRA_TOKENS", "")  # Uncomment in Hex (comma-separated)
+GITHUB_EXTRA_TOKENS = ""
+GITHUB_TOKENS = [t.strip() for t in [GITHUB_TOKEN or "", *GITHUB_EXTRA_TOKENS.split(",")] if t.strip()]
+
+# Rate limiting - token buckets paced to the budget each API reports.
+# GitHub buckets (one set per token) start from these (limit, window seconds) defaults
+# and then follow the X-RateLimit-* response headers; other hosts use the fixed budget below.
+GITHUB_RATE_LIMITS = {
+    "core": (5000, 3600),
+    "search": (30, 60),
+    "graphql": (5000, 3600),
+}
+GITHUB_ANONYMOUS_RATE_LIMITS = {
+    "core": (60, 3600),
+    "search": (10, 60),
+}
+HOST_RATE_LIMITS = {
+    NPM_HOST: (2, 1),
+    PYPISTATS_HOST: (2, 1),
+}
+RATE_LIMIT_BURST = 10  # requests allowed back-to-back before pacing applies
+
+# Date ranges - anchored to the run clock so cassette replays (below) see the same dates
+def set_run_clock(started_at: datetime):
+    """Set RUN_STARTED_AT and the date ranges derived from it."""
+    global RUN_STARTED_AT, END_DATE, START_DATE_90D, START_DATE_30D
+    RUN_STARTED_AT = started_at
+    END_DATE = started_at.strftime("%Y-%m-%d")
+    START_DATE_90D = (started_at - timedelta(days=90)).strftime("%Y-%m-%d")
+    START_DATE_30D = (started_at - timedelta(days=30)).strftime("%Y-%m-%d")
+
+def run_now(tz=None) -> datetime:
+    """The run's reference time, optionally converted to tz (use instead of datetime.now() in the pipeline)."""
+    return RUN_STARTED_AT.astimezone(tz) if tz else RUN_STARTED_AT
+
+set_run_clock(datetime.now())
+
+# HTTP connection pooling - one keep-alive session per API host
+HTTP_POOL_MAXSIZE = 10  # default keep-alive connections per host
+HTTP_POOL_SIZES = {
+    GITHUB_HOST: 20,
+    NPM_HOST: 10,
+    PYPISTATS_HOST: 10,
+    REGISTRY_HOST: 4,
+}
+
+# Concurrency - max in-flight requests per API host (keep <= pool size)
+HTTP_CONCURRENCY_DEFAULT = 4
+HTTP_CONCURRENCY_LIMITS = {
+    GITHUB_HOST: 8,
+    NPM_HOST: 4,
+    PYPISTATS_HOST: 4,
+    REGISTRY_HOST: 2,
+}
+FETCH_WORKERS = 32  # threads backing the concurrent fetch engine
+
+# Conditional request cache - ETag / Last-Modified revalidation on disk
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = ".cache/http"
+HTTP_CACHE_HOSTS = {GITHUB_HOST, REGISTRY_HOST}
+
+# Retries - capped exponential backoff with full jitter for transient failures
+RETRY_MAX_ATTEMPTS = 4  # retries per request after the first attempt
+RETRY_BACKOFF_BASE = 1.0  # seconds
+RETRY_BACKOFF_MAX = 60.0
+RETRY_SECONDARY_LIMIT_WAIT = 60.0  # GitHub asks for >= 1 minute without Retry-After
+RETRY_BUDGET = 500  # total retries allowed per run
+
+# HTTP telemetry - exported by Cell 16 as JSON and as a Prometheus textfile
+HTTP_TELEMETRY_JSON = "http_telemetry.json"
+HTTP_TELEMETRY_PROM = "http_telemetry.prom"  # point at the node exporter's textfile directory
+HTTP_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+# Cassette mode - "record" captures every API exchange to a compressed cassette,
+# "replay" serves them back offline (Cells 2-11 then run without network access)
+HTTP_CASSETTE_MODE = None  # None, "record" or "replay"
+HTTP_CASSETTE_PATH = "cassettes/mcp_refresh.json.gz"
+HTTP_REPLAY_LATENCY_SCALE = 0.0  # 0 = instant replay, 1.0 = recorded latencies
+
+# ============================================
+# HTTP CLIENT
+# ============================================
+
+_http_sessions: Dict[str, requests.Session] = {}
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_http_lock = threading.Lock()
+
+def get_http_session(url: str) -> requests.Session:
+    """Return the pooled session for the URL's host, creating it on first use."""
+    host = urlparse(url).netloc.lower()
+    with _http_lock:
+        session = _http_sessions.get(host)
+        if session is None:
+            session = _new_http_session(host)
+            _http_sessions[host] = session
+    return session
+
+def _new_http_session(host: str) -> requests.Session:
+    pool_size = HTTP_POOL_SIZES.get(host, HTTP_POOL_MAXSIZE)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    """Return the semaphore capping concurrent requests to the URL's host."""
+    host = urlparse(url).netloc.lower()
+    with _http_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(HTTP_CONCURRENCY_LIMITS.get(host, HTTP_CONCURRENCY_DEFAULT))
+            _host_slots[host] = slot
+    return slot
+
+def http_connection_stats() -> pd.DataFrame:
+    """Summarize requests vs. new connections per host to confirm keep-alive reuse."""
+    rows = []
+    for host, session in _http_sessions.items():
+        requests_sent = 0
+        connections_opened = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        rows.append({
+            "host": host,
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": max(0, requests_sent - connections_opened),
+        })
+    return pd.DataFrame(rows, columns=["host", "requests", "connections_opened", "connections_reused"])
+
+# ============================================
+# RATE LIMITING
+# ============================================
+
+class RateLimitBucket:
+    """Token bucket that spreads the remaining request budget over the time left until reset."""
+
+    def __init__(self, limit: int, window: float, burst: int = RATE_LIMIT_BURST):
+        now = time.time()
+        self.limit = limit
+        self.window = window
+        self.burst = max(1, min(burst, limit))
+        self.remaining = limit
+        self.reset_at = now + window
+        self.tokens = float(self.burst)
+        self.refilled_at = now
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        rate = self.remaining / max(self.reset_at - now, 1.0)
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * rate)
+        self.refilled_at = now
+
+    def acquire(self) -> float:
+        """Block until a request may be sent and return the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.time()
+                self._refill(now)
+                if self.remaining > 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.remaining -= 1
+                    return waited
+                if self.remaining <= 0:
+                    # Budget exhausted - sleep until the window resets
+                    wait = self.reset_at - now + 1
+                else:
+                    wait = (1 - self.tokens) * max(self.reset_at - now, 1.0) / self.remaining
+            wait = max(wait, 0.01)
+            time.sleep(wait)
+            waited += wait
+
+    def headroom(self) -> tuple:
+        """Sort key for picking a bucket: most requests left, then earliest reset."""
+        with self.lock:
+            self._refill(time.time())
+            return self.remaining, -self.reset_at
+
+    def update(self, remaining: int, reset_at: float, limit: Optional[int] = None):
+        """Sync the bucket with the budget reported by the API."""
+        with self.lock:
+            if reset_at > self.reset_at + 1 or (limit and limit != self.limit):
+                # A new window started, or the API's budget differs from the assumed default
+                self.remaining = remaining
+            else:
+                # Concurrent responses arrive out of order - keep the lowest count
+                self.remaining = min(self.remaining, remaining)
+            if limit:
+                self.limit = limit
+            self.reset_at = reset_at
+
+_rate_limit_buckets: Dict[str, RateLimitBucket] = {}
+
+def rate_limit_key(url: str) -> Optional[str]:
+    """Map a URL to its rate-limit bucket key, or None if the host is unlimited."""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host == GITHUB_HOST:
+        if parsed.path.startswith("/search/"):
+            return "github:search"
+        if parsed.path.startswith("/graphql"):
+            return "github:graphql"
+        return "github:core"
+    if host in HOST_RATE_LIMITS:
+        return host
+    return None
+
+def get_rate_limit_bucket(key: Optional[str]) -> Optional[RateLimitBucket]:
+    """Return the fixed-budget bucket for a non-GitHub host, creating it on first use."""
+    if key is None or key not in HOST_RATE_LIMITS:
+        return None
+    with _http_lock:
+        bucket = _rate_limit_buckets.get(key)
+        if bucket is None:
+            bucket = RateLimitBucket(*HOST_RATE_LIMITS[key])
+            _rate_limit_buckets[key] = bucket
+    return bucket
+
+class GitHubTokenPool:
+    """Spreads GitHub requests over several tokens, using the one with the most quota left."""
+
+    def __init__(self, tokens: List[str]):
+        self.credentials = list(tokens) or [None]  # None = unauthenticated
+        self.buckets: Dict[tuple, RateLimitBucket] = {}
+        self.requests_sent: Dict[tuple, int] = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, token: Optional[str], resource: str) -> RateLimitBucket:
+        bucket = self.buckets.get((token, resource))
+        if bucket is None:
+            limits = GITHUB_RATE_LIMITS if token else GITHUB_ANONYMOUS_RATE_LIMITS
+            bucket = RateLimitBucket(*limits.get(resource, limits["core"]))
+            self.buckets[(token, resource)] = bucket
+        return bucket
+
+    def checkout(self, resource: str) -> tuple:
+        """Pick the token with the most headroom for a resource; returns (token, bucket)."""
+        with self.lock:
+            candidates = [(self._bucket(token, resource), token) for token in self.credentials]
+            bucket, token = max(candidates, key=lambda c: c[0].headroom())
+            self.requests_sent[(token, resource)] = self.requests_sent.get((token, resource), 0) + 1
+        return token, bucket
+
+    def update(self, token: Optional[str], url: str, response: requests.Response):
+        """Feed X-RateLimit-* headers from a response back into the token's bucket."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+
+        resource = response.headers.get("X-RateLimit-Resource") or rate_limit_key(url).split(":", 1)[1]
+        with self.lock:
+            bucket = self._bucket(token, resource)
+
+        limit = response.headers.get("X-RateLimit-Limit")
+        try:
+            bucket.update(int(remaining), float(reset), int(limit) if limit else None)
+        except ValueError:
+            pass
+
+    def quota(self) -> pd.DataFrame:
+        """Remaining quota and requests sent per token and resource."""
+        rows = []
+        with self.lock:
+            for (token, resource), bucket in sorted(self.buckets.items(), key=lambda kv: (str(kv[0][0]), kv[0][1])):
+                rows.append({
+                    "token": f"...{token[-4:]}" if token else "anonymous",
+                    "resource": resource,
+                    "limit": bucket.limit,
+                    "remaining": bucket.remaining,
+                    "resets_at": datetime.fromtimestamp(bucket.reset_at).strftime("%H:%M:%S"),
+                    "requests_sent": self.requests_sent.get((token, resource), 0),
+                })
+        return pd.DataFrame(rows, columns=["token", "resource", "limit", "remaining", "resets_at", "requests_sent"])
+
+github_token_pool = GitHubTokenPool(GITHUB_TOKENS)
+
+# ============================================
+# CONDITIONAL REQUEST CACHE
+# ============================================
+
+http_cache_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+def _count_cache(stat: str):
+    with _http_lock:
+        http_cache_stats[stat] += 1
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _cache_path(url: str, params: Dict = None) -> str:
+    key = json.dumps([url, sorted((params or {}).items())], default=str)
+    return os.path.join(HTTP_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+def is_cacheable(url: str) -> bool:
+    """
+    Whether responses from this URL's host are kept in the conditional request cache.
+
+    The cache is bypassed in cassette mode so recordings hold full bodies, not 304s.
+    """
+    return HTTP_CACHE_ENABLED and not HTTP_CASSETTE_MODE and urlparse(url).netloc.lower() in HTTP_CACHE_HOSTS
+
+def load_cached_response(url: str, params: Dict = None) -> Optional[Dict]:
+    """Return the cached {etag, last_modified, body} entry for a request, if any."""
+    try:
+        with open(_cache_path(url, params)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def store_cached_response(url: str, params: Dict, response: requests.Response, body):
+    """Persist a response body with its validators so the next run can revalidate it."""
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return
+
+    entry = {"url": url, "etag": etag, "last_modified": last_modified, "body": body}
+    _write_atomic(_cache_path(url, params), json.dumps(entry))
+
+def conditional_headers(entry: Optional[Dict]) -> Dict:
+    """Build If-None-Match / If-Modified-Since headers from a cache entry."""
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+# ============================================
+# RETRIES
+# ============================================
+
+retry_stats = {"retries": 0, "budget_exhausted": 0}
+dead_letters: List[Dict] = []  # requests that still failed after retrying
+
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+def backoff_delay(attempt: int) -> float:
+    """Capped exponential backoff with full jitter."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def retry_delay(response: requests.Response, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a response, or None if it should not be retried."""
+    status = response.status_code
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+    if status == 429:
+        return retry_after if retry_after is not None else backoff_delay(attempt)
+    if status == 403:
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            # Primary limit exhausted - the rate-limit bucket already waits for the reset
+            return retry_after or 0.0
+        if retry_after is not None or "secondary rate limit" in response.text.lower():
+            return retry_after if retry_after is not None else RETRY_SECONDARY_LIMIT_WAIT + backoff_delay(attempt)
+        return None  # permission error - retrying will not help
+    if status >= 500:
+        return retry_after if retry_after is not None else backoff_delay(attempt)
+    return None
+
+def is_retryable(response: requests.Response) -> bool:
+    """Whether a failed response belongs to a transient status class."""
+    return retry_delay(response, 0) is not None
+
+def _take_retry() -> bool:
+    with _http_lock:
+        if retry_stats["retries"] >= RETRY_BUDGET:
+            retry_stats["budget_exhausted"] += 1
+            return False
+        retry_stats["retries"] += 1
+        return True
+
+def record_dead_letter(url: str, params: Dict, reason: str):
+    """Remember a failed request so a later pass can re-fetch it."""
+    with _http_lock:
+        dead_letters.append({
+            "url": url,
+            "params": params,
+            "reason": reason,
+            "failed_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+def take_dead_letters(url_prefix: str = "") -> List[Dict]:
+    """Remove and return dead-lettered requests whose URL starts with url_prefix."""
+    with _http_lock:
+        taken = [d for d in dead_letters if d["url"].startswith(url_prefix)]
+        dead_letters[:] = [d for d in dead_letters if not d["url"].startswith(url_prefix)]
+    return taken
+
+# ============================================
+# HTTP TELEMETRY
+# ============================================
 
-# Date ranges
-END_DATE = datetime.now().strftime("%Y-%m-%d")
-START_DATE_90D = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
-START_DATE_30D = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+# Path patterns collapsed into route templates so metrics aggregate per endpoint
+ROUTE_TEMPLATES = [
+    (re.compile(r"^/repos/[^/]+/[^/]+(?=/|$)"), "/repos/{o}/{r}"),
+    (re.compile(r"^/downloads/(point|range)/[^/]+/.+$"), r"/downloads/\1/{period}/{packages}"),
+    (re.compile(r"^/api/packages/[^/]+/"), "/api/packages/{package}/"),
+    (re.compile(r"^/v0/servers/.+$"), "/v0/servers/{id}"),
+]
+
+def route_template(url: str) -> tuple:
+    """Return (host, route template) for a URL, e.g. ("api.github.com", "/repos/{o}/{r}/contributors")."""
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    for pattern, template in ROUTE_TEMPLATES:
+        path, count = pattern.subn(template, path, count=1)
+        if count:
+            break
+    return parsed.netloc.lower(), path
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class HTTPTelemetry:
+    """Per-host, per-route request metrics: latency histogram, bytes, status codes, retries, waits."""
+
+    def __init__(self, latency_buckets=HTTP_LATENCY_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self.routes: Dict[tuple, Dict] = {}
+        self.lock = threading.Lock()
+
+    def _route(self, url: str) -> Dict:
+        key = route_template(url)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = {
+                "requests": 0,
+                "latency_sum": 0.0,
+                "latency_buckets": [0] * len(self.latency_buckets),
+                "response_bytes": 0,
+                "status_codes": {},
+                "errors": {},
+                "retries": 0,
+                "retry_sleep_seconds": 0.0,
+                "rate_limit_sleeps": 0,
+                "rate_limit_sleep_seconds": 0.0,
+            }
+            self.routes[key] = stats
+        return stats
+
+    def _observe(self, stats: Dict, elapsed: float):
+        stats["requests"] += 1
+        stats["latency_sum"] += elapsed
+        for i, bound in enumerate(self.latency_buckets):
+            if elapsed <= bound:
+                stats["latency_buckets"][i] += 1
+
+    def record_response(self, url: str, elapsed: float, status: int, nbytes: int):
+        with self.lock:
+            stats = self._route(url)
+            self._observe(stats, elapsed)
+            stats["response_bytes"] += nbytes
+            stats["status_codes"][str(status)] = stats["status_codes"].get(str(status), 0) + 1
+
+    def record_error(self, url: str, elapsed: float, error: str):
+        with self.lock:
+            stats = self._route(url)
+            self._observe(stats, elapsed)
+            stats["errors"][error] = stats["errors"].get(error, 0) + 1
+
+    def record_retry(self, url: str, wait: float):
+        with self.lock:
+            stats = self._route(url)
+            stats["retries"] += 1
+            stats["retry_sleep_seconds"] += wait
+
+    def record_rate_limit_wait(self, url: str, waited: float):
+        if waited <= 0:
+            return
+        with self.lock:
+            stats = self._route(url)
+            stats["rate_limit_sleeps"] += 1
+            stats["rate_limit_sleep_seconds"] += waited
+
+    def summary(self) -> pd.DataFrame:
+        """One row per host/route, slowest total time first."""
+        with self.lock:
+            rows = [{
+                "host": host,
+                "route": route,
+                "requests": stats["requests"],
+                "total_seconds": round(stats["latency_sum"], 3),
+                "avg_ms": round(1000 * stats["latency_sum"] / stats["requests"], 1) if stats["requests"] else 0.0,
+                "response_bytes": stats["response_bytes"],
+                "retries": stats["retries"],
+                "rate_limit_sleep_seconds": round(stats["rate_limit_sleep_seconds"], 3),
+                "status_codes": dict(stats["status_codes"]),
+                "errors": dict(stats["errors"]),
+            } for (host, route), stats in self.routes.items()]
+        df = pd.DataFrame(rows, columns=[
+            "host", "route", "requests", "total_seconds", "avg_ms", "response_bytes",
+            "retries", "rate_limit_sleep_seconds", "status_codes", "errors",
+        ])
+        return df.sort_values("total_seconds", ascending=False).reset_index(drop=True)
+
+    def export_json(self, path: str):
+        """Write the full per-route metrics (including histogram buckets) as JSON."""
+        with self.lock:
+            payload = {
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "latency_buckets": list(self.latency_buckets),
+                "routes": [{"host": host, "route": route, **stats} for (host, route), stats in self.routes.items()],
+            }
+        _write_atomic(path, json.dumps(payload, indent=2))
+
+    def export_prometheus(self, path: str):
+        """Write the metrics in Prometheus text exposition format for the node exporter."""
+        def labels(host, route, **extra):
+            pairs = {"host": host, "route": route, **extra}
+            return ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs.items())
+
+        lines = [
+            "# HELP mcp_http_request_duration_seconds HTTP request latency by host and route.",
+            "# TYPE mcp_http_request_duration_seconds histogram",
+        ]
+        with self.lock:
+            routes = sorted(self.routes.items())
+            for (host, route), stats in routes:
+                for bound, count in zip(self.latency_buckets, stats["latency_buckets"]):
+                    lines.append(f"mcp_http_request_duration_seconds_bucket{{{labels(host, route, le=bound)}}} {count}")
+                lines.append(f'mcp_http_request_duration_seconds_bucket{{{labels(host, route, le="+Inf")}}} {stats["requests"]}')
+                lines.append(f"mcp_http_request_duration_seconds_sum{{{labels(host, route)}}} {stats['latency_sum']:.6f}")
+                lines.append(f"mcp_http_request_duration_seconds_count{{{labels(host, route)}}} {stats['requests']}")
+
+            counters = [
+                ("mcp_http_response_bytes_total", "Response body bytes received.", "response_bytes"),
+                ("mcp_http_retries_total", "Requests retried after a transient failure.", "retries"),
+                ("mcp_http_retry_sleep_seconds_total", "Seconds spent in retry backoff.", "retry_sleep_seconds"),
+                ("mcp_http_rate_limit_sleeps_total", "Requests delayed by a rate-limit bucket.", "rate_limit_sleeps"),
+                ("mcp_http_rate_limit_sleep_seconds_total", "Seconds spent waiting on rate-limit buckets.", "rate_limit_sleep_seconds"),
+            ]
+            for name, help_text, field in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [f"{name}{{{labels(host, route)}}} {stats[field]}" for (host, route), stats in routes]
+
+            lines += ["# HELP mcp_http_responses_total Responses by status code.", "# TYPE mcp_http_responses_total counter"]
+            for (host, route), stats in routes:
+                lines += [f"mcp_http_responses_total{{{labels(host, route, status=code)}}} {n}"
+                          for code, n in sorted(stats["status_codes"].items())]
+
+            lines += ["# HELP mcp_http_errors_total Requests that raised before a response.", "# TYPE mcp_http_errors_total counter"]
+            for (host, route), stats in routes:
+                lines += [f"mcp_http_errors_total{{{labels(host, route, error=err)}}} {n}"
+                          for err, n in sorted(stats["errors"].items())]
+
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+http_telemetry = HTTPTelemetry()
+
+# ============================================
+# RECORD / REPLAY CASSETTES
+# ============================================
+
+# Response headers worth keeping in a cassette (pagination, caching, rate limits)
+CASSETTE_HEADERS = (
+    "Content-Type", "ETag", "Last-Modified", "Link", "Retry-After",
+    "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-RateLimit-Resource",
+)
+
+class CassetteMissError(requests.exceptions.RequestException):
+    """Raised in replay mode for a request that is not on the cassette."""
+
+class HTTPCassette:
+    """Records API exchanges to a gzipped JSON cassette and replays them in order."""
+
+    def __init__(self, mode: Optional[str], path: str):
+        if mode not in (None, "record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.recorded_at = datetime.now()
+        self.interactions: Dict[str, List[Dict]] = {}
+        self.replay_positions: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str, params: Dict = None, json_body: Optional[Dict] = None) -> str:
+        return json.dumps([method.upper(), url, sorted((params or {}).items()), json_body], sort_keys=True, default=str)
+
+    def record(self, method: str, url: str, params: Dict, json_body: Optional[Dict],
+               response: requests.Response, elapsed: float):
+        interaction = {
+            "status": response.status_code,
+            "headers": {h: response.headers[h] for h in CASSETTE_HEADERS if h in response.headers},
+            "body": response.text,
+            "elapsed": round(elapsed, 4),
+        }
+        with self.lock:
+            self.interactions.setdefault(self.key(method, url, params, json_body), []).append(interaction)
+
+    def play(self, method: str, url: str, params: Dict, json_body: Optional[Dict]) -> requests.Response:
+        """Return the next recorded response for a request (the last one repeats once exhausted)."""
+        key = self.key(method, url, params, json_body)
+        with self.lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(f"No cassette entry for {method} {url} {params or ''}")
+            position = self.replay_positions.get(key, 0)
+            self.replay_positions[key] = position + 1
+            interaction = recorded[min(position, len(recorded) - 1)]
+
+        if HTTP_REPLAY_LATENCY_SCALE > 0:
+            time.sleep(interaction["elapsed"] * HTTP_REPLAY_LATENCY_SCALE)
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.headers = requests.structures.CaseInsensitiveDict(interaction["headers"])
+        response._content = interaction["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = requests.Request(method, url, params=params).prepare().url
+        response.reason = "Replayed"
+        return response
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        with self.lock:
+            payload = {
+                "recorded_at": self.recorded_at.isoformat(),
+                "interactions": [{"key": k, "responses": v} for k, v in self.interactions.items()],
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    def load(self, path: Optional[str] = None):
+        with gzip.open(path or self.path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        self.recorded_at = datetime.fromisoformat(payload["recorded_at"])
+        self.interactions = {entry["key"]: entry["responses"] for entry in payload["interactions"]}
+        self.replay_positions = {}
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+def save_http_cassette():
+    """Write the cassette when recording (called after the last API cell)."""
+    if http_cassette.recording:
+        http_cassette.save()
+        total = sum(len(v) for v in http_cassette.interactions.values())
+        print(f"✓ Recorded {total} API responses to {http_cassette.path}")
+
+def api_sleep(seconds: float):
+    """Sleep between API calls - skipped when replaying a cassette."""
+    if seconds > 0 and not http_cassette.replaying:
+        time.sleep(seconds)
+
+http_cassette = HTTPCassette(HTTP_CASSETTE_MODE, HTTP_CASSETTE_PATH)
+if http_cassette.replaying:
+    http_cassette.load()
+    set_run_clock(http_cassette.recorded_at)
+else:
+    http_cassette.recorded_at = RUN_STARTED_AT
+
+# ============================================
+# API REQUESTS
+# ============================================
+
+def _send(method: str, url: str, headers: Dict, params: Dict, json_body: Optional[Dict], timeout: float) -> requests.Response:
+    key = rate_limit_key(url)
+    is_github = key is not None and key.startswith("github:")
+    token = None
+    if is_github:
+        token, bucket = github_token_pool.checkout(key.split(":", 1)[1])
+        if token:
+            headers = {**headers, "Authorization": f"token {token}"}
+    else:
+        bucket = get_rate_limit_bucket(key)
+    if bucket is not None and not http_cassette.replaying:
+        http_telemetry.record_rate_limit_wait(url, bucket.acquire())
+
+    with host_slot(url):
+        started = time.perf_counter()
+        try:
+            if http_cassette.replaying:
+                response = http_cassette.play(method, url, params, json_body)
+            else:
+                response = get_http_session(url).request(
+                    method, url, headers=headers, params=params, json=json_body, timeout=timeout
+                )
+        except requests.exceptions.RequestException as e:
+            http_telemetry.record_error(url, time.perf_counter() - started, type(e).__name__)
+            raise
+    elapsed = time.perf_counter() - started
+    http_telemetry.record_response(url, elapsed, response.status_code, len(response.content))
+    if http_cassette.recording:
+        http_cassette.record(method, url, params, json_body, response, elapsed)
+    if is_github:
+        github_token_pool.update(token, url, response)
+    return response
+
+def http_request(method: str, url: str, headers: Dict = None, params: Dict = None,
+                 json_body: Optional[Dict] = None, timeout: float = 30) -> requests.Response:
+    """
+    Send a request through the host's pooled session, paced by its rate-limit bucket.
+    GitHub requests are authenticated with the pooled token that has the most quota left.
+
+    Transient failures (429, secondary-rate-limit 403, 5xx, connection errors)
+    are retried with backoff until RETRY_MAX_ATTEMPTS or the run's RETRY_BUDGET
+    is used up; the last response is returned or the last error raised.
+    """
+    request_headers = {"Accept": "application/json"}
+    if headers:
+        request_headers.update(headers)
+
+    attempt = 0
+    while True:
+        try:
+            response = _send(method, url, request_headers, params, json_body, timeout)
+        except RETRYABLE_EXCEPTIONS as e:
+            if attempt >= RETRY_MAX_ATTEMPTS or not _take_retry():
+                raise
+            wait = backoff_delay(attempt)
+            print(f"  Retrying {url} in {wait:.1f}s ({type(e).__name__})")
+            http_telemetry.record_retry(url, wait)
+        else:
+            wait = retry_delay(response, attempt)
+            if wait is None or attempt >= RETRY_MAX_ATTEMPTS or not _take_retry():
+                return response
+            print(f"  Retrying {url} in {wait:.1f}s (HTTP {response.status_code})")
+            http_telemetry.record_retry(url, wait)
+
+        api_sleep(wait)
+        attempt += 1
+
+def http_get(url: str, headers: Dict = None, params: Dict = None, timeout: float = 30) -> requests.Response:
+    """GET shorthand for http_request."""
+    return http_request("GET", url, headers=headers, params=params, timeout=timeout)
+
+def graphql_request(query: str, variables: Dict = None) -> Optional[Dict]:
+    """
+    Run a GitHub GraphQL query and return its `data` object.
+
+    Partial data is returned when some fields fail (e.g. a NOT_FOUND repository
+    alias comes back as null). Requires a GitHub token.
+    """
+    if not GITHUB_TOKENS:
+        print("GraphQL requests need GITHUB_TOKEN - skipping")
+        return None
+
+    url = f"{GITHUB_API_BASE}/graphql"
+    try:
+        response = http_request("POST", url, json_body={"query": query, "variables": variables or {}})
+        response.raise_for_status()
+        payload = response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"GraphQL request failed: {e}")
+        return None
+
+    for error in payload.get("errors") or []:
+        if error.get("type") != "NOT_FOUND":
+            print(f"GraphQL error: {error.get('message')}")
+    return payload.get("data")
 
 # Helper function for API requests
 def safe_request(url: str, headers: Dict = None, params: Dict = None, delay: float = 0) -> Optional[Dict]:
-    """Make a safe API request with error handling and optional delay."""
-    if delay > 0:
-        time.sleep(delay)
+    """
+    Make a safe API request with error handling.
+
+    Requests are paced by the host's rate-limit bucket; `delay` only applies
+    to hosts without one.
+    """
+    if delay > 0 and rate_limit_key(url) is None:
+        api_sleep(delay)
+
+    cacheable = is_cacheable(url)
+    cached = load_cached_response(url, params) if cacheable else None
+    if cacheable:
+        _count_cache("hits" if cached else "misses")
 
     try:
-        default_headers = {"Accept": "application/json"}
-        if GITHUB_TOKEN and "github.com" in url:
-            default_headers["Authorization"] = f"token {GITHUB_TOKEN}"
-        if headers:
-            default_headers.update(headers)
+        response = http_get(url, headers={**conditional_headers(cached), **(headers or {})}, params=params)
+
+        # 304 Not Modified - serve the cached body (free against GitHub's rate limit)
+        if response.status_code == 304 and cached:
+            _count_cache("not_modified")
+            return cached["body"]
 
-        response = requests.get(url, headers=default_headers, params=params, timeout=30)
+        if is_retryable(response):
+            record_dead_letter(url, params, f"HTTP {response.status_code}")
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        if cacheable:
+            store_cached_response(url, params, response, data)
+        return data
+    except RETRYABLE_EXCEPTIONS as e:
+        print(f"Request failed for {url}: {e}")
+        record_dead_letter(url, params, type(e).__name__)
+        return None
     except requests.exceptions.RequestException as e:
         print(f"Request failed for {url}: {e}")
         return None
 
+# ============================================
+# CONCURRENT FETCH ENGINE
+# ============================================
+
+_fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+async def async_safe_request(url: str, headers: Dict = None, params: Dict = None, delay: float = 0) -> Optional[Dict]:
+    """Async drop-in for safe_request, bounded by the same per-host limits."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_fetch_executor, partial(safe_request, url, headers, params, delay))
+
+async def gather_fetches(func, jobs: List[tuple]) -> List:
+    """Run func(*job) for every job on the fetch pool; failed jobs yield None."""
+    loop = asyncio.get_running_loop()
+    futures = [loop.run_in_executor(_fetch_executor, partial(func, *job)) for job in jobs]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"Fetch failed for {func.__name__}{job}: {result}")
+    return [None if isinstance(r, Exception) else r for r in results]
+
+def run_async(coro):
+    """Run a coroutine to completion, also from inside a notebook's running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, coro).result()
+
+def run_fetches(func, jobs: List[tuple]) -> List:
+    """Run func(*job) concurrently for all jobs and return results in job order."""
+    if not jobs:
+        return []
+    return run_async(gather_fetches(func, jobs))
+
+# ============================================
+# REPOSITORY URLS
+# ============================================
+
+# One pass over https://, git+https://, ssh:// and scp-style (git@host:owner/repo) URLs;
+# the path stops at a query or fragment
+REPO_URL_PATTERN = re.compile(
+    r"^\s*(?:git\+)?(?:[a-z][a-z0-9+.-]*://)?(?:[^@/\s]+@)?(?:www\.)?"
+    r"(?P<host>[a-z0-9.-]+\.[a-z]{2,})(?::\d+)?[/:](?P<path>[^?#\s]*)",
+    re.IGNORECASE,
+)
+REPO_URL_CACHE_SIZE = 1 << 16  # distinct URLs remembered by parse_repo_url
+# Code forges whose URLs parse into repos, and the path segment that starts a directory link
+# (".../tree/<ref>/<subdir>"); URLs on any other host name no repo
+REPO_URL_FORGES = {"github.com": "tree", "gitlab.com": "tree", "bitbucket.org": "src"}
+
+@lru_cache(maxsize=REPO_URL_CACHE_SIZE)
+def parse_repo_url(url: str) -> Optional[tuple]:
+    """
+    Return (host, owner, repo, subdir) for a repository URL on a REPO_URL_FORGES host,
+    or None if it names no repo there.
+
+    Hosts are lowercased; the rest keeps its case. GitLab owners can be nested groups
+    ("group/subgroup"), and a GitLab path ends at its "/-/" separator. Elsewhere owner
+    and repo are the first two path segments. subdir is the directory of a tree link
+    (".../tree/<ref>/<subdir>"), so servers in one monorepo stay apart; it is "" for the
+    repo root and for links to anything else. Memoized, so every cell parses each
+    distinct URL once.
+    """
+    match = REPO_URL_PATTERN.match(url) if isinstance(url, str) else None
+    if not match:
+        return None
+    host = match.group("host").lower()
+    if host not in REPO_URL_FORGES:
+        return None
+    segments = [s for s in match.group("path").split("/") if s]
+    if host == "gitlab.com":
+        separator = segments.index("-") if "-" in segments else len(segments)
+        segments, rest = segments[:separator], segments[separator + 1:]
+        if len(segments) < 2:
+            return None
+        owner, repo = "/".join(segments[:-1]), segments[-1]
+    else:
+        if len(segments) < 2:
+            return None
+        owner, repo, rest = segments[0], segments[1], segments[2:]
+    if repo.lower().endswith(".git"):
+        repo = repo[:-4]
+    if not repo:
+        return None
+    tree = rest[:1] == [REPO_URL_FORGES[host]] and len(rest) > 2
+    return host, owner, repo, "/".join(rest[2:]) if tree else ""
+
+def parse_repo_urls(urls: pd.Series) -> pd.DataFrame:
+    """parse_repo_url over a Series, once per distinct value: host, owner, repo and subdir columns (None if unparsed)."""
+    codes, uniques = pd.factorize(urls)
+    parsed = [parse_repo_url(url) or (None,) * 4 for url in uniques]
+    table = pd.DataFrame(parsed + [(None,) * 4], columns=["host", "owner", "repo", "subdir"], dtype=object)
+    # Missing values have code -1, which picks the trailing all-None row
+    return table.iloc[codes].set_index(urls.index)
+
 print("✓ Configuration loaded")
 print(f"  Date range: {START_DATE_90D} to {END_DATE}")
-print(f"  GitHub token: {'Configured' if GITHUB_TOKEN else 'Not set (rate limits apply)'}")
+if http_cassette.mode:
+    print(f"  Cassette: {http_cassette.mode} ({HTTP_CASSETTE_PATH})")
+print(f"  GitHub token: {f'{len(GITHUB_TOKENS)} configured' if GITHUB_TOKENS else 'Not set (rate limits apply)'}")
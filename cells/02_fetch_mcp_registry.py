@@ -1,81 +1,417 @@
 # Cell 2: Fetch MCP Registry Servers
 # Fetches all registered MCP servers from the official registry with pagination
 
+REGISTRY_COLUMNS = [
+    "server_id", "name", "description", "repository", "npm_package", "pypi_package",
+    "categories", "author", "version", "source", "discovered_date", "packages"
+]
+REGISTRY_MIRROR_VERSION = 3
+
+def registry_updated_at(server: Dict) -> Optional[str]:
+    """Last-updated timestamp of a registry entry, from the top level or the official _meta block."""
+    official = (server.get("_meta") or {}).get("io.modelcontextprotocol.registry/official") or {}
+    return server.get("updated_at") or server.get("updatedAt") or official.get("updatedAt")
+
+def normalize_registry_servers(servers: List[Dict], discovered_dates: List[str],
+                               packages: Optional[List[Optional[List[Dict]]]] = None) -> pd.DataFrame:
+    """
+    Normalize raw registry entries into REGISTRY_COLUMNS.
+
+    `packages` holds each entry's full package list from its detail record, where one
+    was fetched; it overrides the thin `package` field.
+    """
+    records = []
+    for i, server in enumerate(servers):
+        # Extract package references
+        package_info = server.get("package", {})
+        npm_pkg = None
+        pypi_pkg = None
+
+        if isinstance(package_info, dict):
+            npm_pkg = package_info.get("npm")
+            pypi_pkg = package_info.get("pypi")
+        elif isinstance(package_info, str):
+            if "npmjs" in package_info or package_info.startswith("@"):
+                npm_pkg = package_info
+            elif "pypi" in package_info:
+                pypi_pkg = package_info
+
+        # Full package lists are kept as "registry:name,..."
+        listed = packages[i] if packages else None
+        if listed:
+            first = {}
+            for package in listed:
+                first.setdefault(package["registry"], package["name"])
+            npm_pkg = first.get("npm", npm_pkg)
+            pypi_pkg = first.get("pypi", pypi_pkg)
+            listed = ",".join(f"{package['registry']}:{package['name']}" for package in listed)
+
+        # Extract repository URL
+        repo = server.get("repository", server.get("repo", server.get("source_url", "")))
+        if isinstance(repo, dict):
+            # Servers in a monorepo name their directory; link to it so they are not merged
+            subfolder = (repo.get("subfolder") or "").strip("/")
+            repo = repo.get("url", "")
+            if repo and subfolder:
+                repo = f"{repo.rstrip('/')}/tree/HEAD/{subfolder}"
+
+        records.append({
+            "server_id": server.get("id", server.get("name", "")),
+            "name": server.get("name", server.get("display_name", "")),
+            "description": server.get("description", "")[:500] if server.get("description") else "",
+            "repository": repo,
+            "npm_package": npm_pkg,
+            "pypi_package": pypi_pkg,
+            "categories": ",".join(server.get("categories", [])) if isinstance(server.get("categories"), list) else server.get("categories", ""),
+            "author": server.get("author", server.get("publisher", "")),
+            "version": server.get("version", ""),
+            "source": "mcp_registry",
+            "discovered_date": discovered_dates[i],
+            "packages": listed or None,
+        })
+
+    return pd.DataFrame(records, columns=REGISTRY_COLUMNS)
+
+# ============================================
+# MIRROR AND CHECKPOINT
+# ============================================
+
+def load_registry_mirror() -> Dict[str, Dict]:
+    """Known registry entries as {server_id: {"server": raw entry, "marker": ..., "discovered": date}}."""
+    try:
+        with gzip.open(REGISTRY_MIRROR_PATH, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, EOFError, ValueError):
+        return {}
+    return payload["servers"] if payload.get("version") == REGISTRY_MIRROR_VERSION else {}
+
+def save_registry_mirror(mirror: Dict[str, Dict]):
+    directory = os.path.dirname(REGISTRY_MIRROR_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{REGISTRY_MIRROR_PATH}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"version": REGISTRY_MIRROR_VERSION, "servers": mirror}, f)
+    os.replace(tmp_path, REGISTRY_MIRROR_PATH)
+
+def load_registry_checkpoint() -> Dict:
+    try:
+        with open(REGISTRY_CHECKPOINT_PATH) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return checkpoint if checkpoint.get("version") == REGISTRY_MIRROR_VERSION else {}
+
+def write_registry_checkpoint(checkpoint: Dict):
+    _write_atomic(REGISTRY_CHECKPOINT_PATH, json.dumps(checkpoint, indent=2))
+
+def registry_journal_header(limit_per_page: int, updated_since: Optional[str]) -> Dict:
+    """The request a crawl journal's pages came from, minus the cursor."""
+    params = {"limit": limit_per_page}
+    if updated_since and REGISTRY_UPDATED_SINCE_PARAM:
+        params[REGISTRY_UPDATED_SINCE_PARAM] = updated_since
+    return {"url": f"{MCP_REGISTRY_BASE}/servers", "params": params}
+
+def read_registry_journal() -> Tuple[Optional[Dict], List[Dict]]:
+    """Header and raw pages written by an interrupted crawl, up to the first torn line."""
+    header, pages = None, []
+    try:
+        with open(REGISTRY_RAW_PAGES_PATH, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if header is None:
+                    header = record.get("journal")
+                else:
+                    pages.append(record)
+    except (OSError, TypeError, AttributeError):
+        pass
+    return header, pages
+
+def clear_registry_journal():
+    if REGISTRY_RAW_PAGES_PATH and os.path.exists(REGISTRY_RAW_PAGES_PATH):
+        os.remove(REGISTRY_RAW_PAGES_PATH)
+
+def apply_registry_page(servers: List[Dict], mirror: Dict[str, Dict], crawl: Dict, seen: set,
+                        discovered_date: str) -> int:
+    """
+    Merge one page of raw entries into the mirror; returns how many were new or changed.
+
+    The mirror holds one entry per server id, so a new version replaces the old one.
+    When a crawl lists several versions of a server, the most recently updated is kept.
+    """
+    changed = 0
+    for server in servers:
+        key = server.get("id", server.get("name", ""))
+        # The update timestamp identifies a revision; hash the entry when there is none
+        updated = registry_updated_at(server)
+        marker = updated or hashlib.sha1(json.dumps(server, sort_keys=True).encode()).hexdigest()
+        known = mirror.get(key)
+        if known and key in seen and known["server"].get("version") != server.get("version") \
+                and (registry_updated_at(known["server"]) or "") > (updated or ""):
+            continue
+        seen.add(key)
+        if known and known["marker"] == marker:
+            continue
+        mirror[key] = {
+            "server": server,
+            "marker": marker,
+            # Keep the date the server was first discovered
+            "discovered": known["discovered"] if known else discovered_date,
+        }
+        changed += 1
+
+        if updated and (not crawl.get("newest_updated_at") or updated > crawl["newest_updated_at"]):
+            crawl["newest_updated_at"] = updated
+    return changed
+
+# ============================================
+# DETAIL ENRICHMENT
+# ============================================
+
+def parse_registry_packages(packages) -> List[Dict]:
+    """Reduce a registry packages array to [{"registry": "npm", "name": "..."}, ...]."""
+    parsed = []
+    for package in packages if isinstance(packages, list) else []:
+        if not isinstance(package, dict):
+            continue
+        registry = (package.get("registryType") or package.get("registry_type")
+                    or package.get("registry_name") or package.get("registryName") or "")
+        name = package.get("identifier") or package.get("name")
+        if registry and name:
+            parsed.append({"registry": registry.lower(), "name": name})
+    return parsed
+
+def fetch_registry_server_packages(server_id: str, version: str) -> Optional[List[Dict]]:
+    """Fetch one server's full registry record and return its parsed package list."""
+    params = {"version": version} if version else None
+    response = safe_request(f"{MCP_REGISTRY_BASE}/servers/{quote(server_id, safe='')}", params=params)
+    if not response:
+        return None
+    detail = response.get("server", response)
+    return parse_registry_packages(detail.get("packages"))
+
+def enrich_registry_details(mirror: Dict[str, Dict]) -> int:
+    """
+    Attach the full package list to mirror entries that do not have one yet.
+
+    Mirror entries are keyed by server id and replaced when they change, so each
+    server version's detail record is fetched once. Entries whose list record
+    already carries a packages array need no request. Returns the number fetched.
+    """
+    keys, jobs = [], []
+    for key, entry in mirror.items():
+        if "packages" in entry:
+            continue
+        server = entry["server"]
+        if isinstance(server.get("packages"), list):
+            entry["packages"] = parse_registry_packages(server["packages"])
+            continue
+        server_id = server.get("id", server.get("name"))
+        if server_id:
+            keys.append(key)
+            jobs.append((server_id, server.get("version", "")))
+
+    # Failed lookups stay unset and are retried on the next run
+    for key, packages in zip(keys, run_fetches(fetch_registry_server_packages, jobs)):
+        if packages is not None:
+            mirror[key]["packages"] = packages
+    return len(jobs)
+
+# ============================================
+# CRAWL
+# ============================================
+
+def fetch_registry_pages(pages: queue.Queue, crawl: Dict, stop: threading.Event,
+                         limit_per_page: int, max_pages: int, persist: bool):
+    """
+    Producer: follow next_cursor page by page, handing each raw page to the parser.
+
+    When persist is set, each page is appended to the crawl journal
+    (REGISTRY_RAW_PAGES_PATH, headed by the request it came from) and the checkpoint
+    records the cursor after it, so an interrupted crawl can resume. crawl["status"] ends as "complete", "stopped", "failed" or "page_cap".
+    A None on the queue marks the end of the crawl.
+    """
+    journal = None
+    try:
+        if persist and REGISTRY_RAW_PAGES_PATH:
+            os.makedirs(os.path.dirname(REGISTRY_RAW_PAGES_PATH) or ".", exist_ok=True)
+            journal = open(REGISTRY_RAW_PAGES_PATH, "a" if crawl["pages"] else "w", encoding="utf-8")
+            if not crawl["pages"]:
+                header = registry_journal_header(limit_per_page, crawl["updated_since"])
+                journal.write(json.dumps({"journal": header}) + "\n")
+
+        crawl["status"] = "page_cap"
+        for _ in range(max_pages):
+            if crawl["pages"] and not crawl["cursor"]:
+                # A resumed crawl that had already reached the last page
+                crawl["status"] = "complete"
+                break
+            if stop.is_set():
+                crawl["status"] = "stopped"
+                break
+
+            params = {"limit": limit_per_page}
+            if crawl["cursor"]:
+                params["cursor"] = crawl["cursor"]
+            if crawl["updated_since"] and REGISTRY_UPDATED_SINCE_PARAM:
+                params[REGISTRY_UPDATED_SINCE_PARAM] = crawl["updated_since"]
+
+            response = safe_request(f"{MCP_REGISTRY_BASE}/servers", params=params)
+            if not response:
+                print(f"Failed to fetch page {crawl['pages'] + 1}")
+                crawl["status"] = "failed"
+                break
+
+            if journal:
+                journal.write(json.dumps(response) + "\n")
+                journal.flush()
+            crawl["pages"] += 1
+            crawl["cursor"] = response.get("next_cursor", response.get("cursor"))
+            if persist:
+                write_registry_checkpoint(crawl)
+            pages.put(response)
+
+            if not crawl["cursor"] or not response.get("servers", response.get("items")):
+                crawl["status"] = "complete"
+                break
+    finally:
+        if journal:
+            journal.close()
+        pages.put(None)
+
+def start_registry_crawl(checkpoint: Dict, has_mirror: bool) -> Dict:
+    """Crawl state for a fresh run: a full sync when due, otherwise only what changed."""
+    last_full_sync = checkpoint.get("last_full_sync")
+    full_sync = (
+        not has_mirror or not last_full_sync
+        or (RUN_STARTED_AT - datetime.fromisoformat(last_full_sync)).days >= REGISTRY_FULL_SYNC_DAYS
+    )
+    return {
+        "version": REGISTRY_MIRROR_VERSION,
+        "in_progress": True,
+        "full_sync": full_sync,
+        "cursor": None,
+        "pages": 0,
+        "updated_since": None if full_sync else checkpoint.get("newest_updated_at"),
+        "newest_updated_at": checkpoint.get("newest_updated_at"),
+        "last_full_sync": last_full_sync,
+        "started_at": RUN_STARTED_AT.isoformat(timespec="seconds"),
+    }
+
 def fetch_mcp_registry_servers(limit_per_page: int = 100, max_pages: int = 50) -> pd.DataFrame:
     """
     Fetch all servers from MCP Registry with pagination.
 
+    With REGISTRY_INCREMENTAL, servers are synced into a local mirror: runs fetch only
+    entries updated since the last sync (or stop after pages of unchanged entries), and
+    an interrupted crawl resumes from its checkpointed cursor. A background fetcher
+    follows the cursor chain while this thread merges the pages already received;
+    the mirror is normalized into rows once at the end. With
+    REGISTRY_FETCH_DETAILS, each server version's detail record is fetched once,
+    concurrently, for its full package list.
+
     Returns DataFrame with columns:
     - server_id, name, description, repository, npm_package, pypi_package,
-    - categories, author, version, created_at
+    - categories, author, version, source, discovered_date, packages
     """
-    all_servers = []
-    cursor = None
-    page = 0
+    # Cassette runs must see exactly the recorded requests, so they always crawl from scratch
+    incremental = REGISTRY_INCREMENTAL and not HTTP_CASSETTE_MODE
+    mirror = load_registry_mirror() if incremental else {}
+    checkpoint = load_registry_checkpoint() if incremental else {}
+    discovered_date = RUN_STARTED_AT.strftime("%Y-%m-%d")
+    seen = set()
 
-    while page < max_pages:
-        params = {"limit": limit_per_page}
-        if cursor:
-            params["cursor"] = cursor
+    crawl = None
+    if checkpoint.get("in_progress"):
+        header, journal_pages = read_registry_journal()
+        # Without the journal the pages before the cursor are lost, and a cursor from another
+        # endpoint or page size means nothing here - start over instead
+        if header != registry_journal_header(limit_per_page, checkpoint.get("updated_since")):
+            print("  Interrupted crawl used another registry request - starting over")
+        elif len(journal_pages) >= checkpoint.get("pages", 0):
+            crawl = checkpoint
+            for response in journal_pages:
+                apply_registry_page(response.get("servers", response.get("items", [])),
+                                    mirror, crawl, seen, discovered_date)
+            crawl["pages"] = len(journal_pages)
+            print(f"  Resuming interrupted crawl after {crawl['pages']} pages")
+    if crawl is None:
+        crawl = start_registry_crawl(checkpoint, bool(mirror))
+        mode = "full sync" if crawl["full_sync"] else f"changes since {crawl['updated_since'] or 'last sync'}"
+        print(f"  Registry crawl: {mode} ({len(mirror)} servers in mirror)")
 
-        url = f"{MCP_REGISTRY_BASE}/servers"
-        response = safe_request(url, params=params)
+    pages = queue.Queue(maxsize=REGISTRY_PREFETCH_PAGES)
+    stop = threading.Event()
+    fetcher = threading.Thread(
+        target=fetch_registry_pages,
+        args=(pages, crawl, stop, limit_per_page, max_pages, incremental),
+        daemon=True,
+    )
+    fetcher.start()
 
-        if not response:
-            print(f"Failed to fetch page {page + 1}")
+    page = 0
+    unchanged_pages = 0
+    stopped_early = False
+    while True:
+        response = pages.get()
+        if response is None:
             break
 
         servers = response.get("servers", response.get("items", []))
         if not servers:
             break
 
-        for server in servers:
-            # Extract package references
-            package_info = server.get("package", {})
-            npm_pkg = None
-            pypi_pkg = None
-
-            if isinstance(package_info, dict):
-                npm_pkg = package_info.get("npm")
-                pypi_pkg = package_info.get("pypi")
-            elif isinstance(package_info, str):
-                if "npmjs" in package_info or package_info.startswith("@"):
-                    npm_pkg = package_info
-                elif "pypi" in package_info:
-                    pypi_pkg = package_info
-
-            # Extract repository URL
-            repo = server.get("repository", server.get("repo", server.get("source_url", "")))
-            if isinstance(repo, dict):
-                repo = repo.get("url", "")
-
-            all_servers.append({
-                "server_id": server.get("id", server.get("name", "")),
-                "name": server.get("name", server.get("display_name", "")),
-                "description": server.get("description", "")[:500] if server.get("description") else "",
-                "repository": repo,
-                "npm_package": npm_pkg,
-                "pypi_package": pypi_pkg,
-                "categories": ",".join(server.get("categories", [])) if isinstance(server.get("categories"), list) else server.get("categories", ""),
-                "author": server.get("author", server.get("publisher", "")),
-                "version": server.get("version", ""),
-                "source": "mcp_registry",
-                "discovered_date": datetime.now().strftime("%Y-%m-%d")
-            })
-
-        # Check for pagination cursor
-        cursor = response.get("next_cursor", response.get("cursor"))
-        if not cursor:
+        changed = apply_registry_page(servers, mirror, crawl, seen, discovered_date)
+        page += 1
+        print(f"  Fetched page {page}, new or changed: {changed}, total servers: {len(mirror)}")
+
+        # Pages holding only known, unchanged servers mean the rest is already mirrored
+        unchanged_pages = 0 if changed else unchanged_pages + 1
+        if incremental and not crawl["full_sync"] and REGISTRY_EARLY_STOP_PAGES \
+                and unchanged_pages >= REGISTRY_EARLY_STOP_PAGES:
+            print(f"  {unchanged_pages} pages without changes - stopping early")
+            stopped_early = True
+            stop.set()
             break
 
-        page += 1
-        print(f"  Fetched page {page}, total servers: {len(all_servers)}")
+    # Drain so the fetcher is never left blocked on a full queue
+    while fetcher.is_alive() or not pages.empty():
+        try:
+            pages.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+    finished = stopped_early or crawl["status"] == "complete"
+    if finished and crawl["full_sync"]:
+        # Drop servers that have been removed from the registry
+        mirror = {key: entry for key, entry in mirror.items() if key in seen}
+
+    if REGISTRY_FETCH_DETAILS:
+        fetched = enrich_registry_details(mirror)
+        print(f"  Fetched {fetched} server detail records")
+
+    if incremental and finished:
+        crawl.update(in_progress=False, cursor=None, updated_since=None, status="complete",
+                     synced_at=run_now().isoformat(timespec="seconds"))
+        if crawl["full_sync"]:
+            crawl["last_full_sync"] = crawl["started_at"]
+        save_registry_mirror(mirror)
+        write_registry_checkpoint(crawl)
+        # Every page of the finished crawl is in the mirror; nothing is left to resume
+        clear_registry_journal()
+    elif incremental:
+        print(f"  Crawl incomplete ({crawl['status']}) - the next run resumes after page {crawl['pages']}")
 
-    return pd.DataFrame(all_servers)
+    entries = list(mirror.values())
+    return normalize_registry_servers([e["server"] for e in entries], [e["discovered"] for e in entries],
+                                      [e.get("packages") for e in entries])
 
 # Execute the fetch
 print("Fetching MCP Registry servers...")
-registry_servers_df = fetch_mcp_registry_servers()
+registry_servers_df = fetch_mcp_registry_servers(max_pages=REGISTRY_MAX_PAGES)
 print(f"✓ Found {len(registry_servers_df)} servers in MCP Registry")
 
 # Display sample
@@ -1,6 +1,17 @@
 # Cell 3: GitHub Discovery - Find MCP Repos via Search
 # Discovers MCP servers through GitHub Search API queries
 
+def github_search_page(query: str, page: int, per_page: int = 100) -> Optional[Dict]:
+    """Fetch one page of repository search results (total_count and items)."""
+    params = {
+        "q": query,
+        "sort": "stars",
+        "order": "desc",
+        "per_page": per_page,
+        "page": page
+    }
+    return safe_request(f"{GITHUB_API_BASE}/search/repositories", params=params)
+
 def github_search_repos(query: str, max_results: int = 100) -> List[Dict]:
     """Search GitHub repos with pagination."""
     repos = []
@@ -8,19 +19,7 @@ def github_search_repos(query: str, max_results: int = 100) -> List[Dict]:
     pages_needed = (max_results + per_page - 1) // per_page
 
     for page in range(1, pages_needed + 1):
-        params = {
-            "q": query,
-            "sort": "stars",
-            "order": "desc",
-            "per_page": per_page,
-            "page": page
-        }
-
-        response = safe_request(
-            f"{GITHUB_API_BASE}/search/repositories",
-            params=params,
-            delay=GITHUB_RATE_LIMIT_DELAY
-        )
+        response = github_search_page(query, page, per_page)
 
         if not response or "items" not in response:
             break
@@ -32,6 +31,57 @@ def github_search_repos(query: str, max_results: int = 100) -> List[Dict]:
 
     return repos[:max_results]
 
+def created_shard(query: str, start: datetime, end: datetime) -> str:
+    """The query restricted to repos created in [start, end] (inclusive, UTC)."""
+    return f"{query} created:{start:%Y-%m-%dT%H:%M:%SZ}..{end:%Y-%m-%dT%H:%M:%SZ}"
+
+def github_search_sharded(query: str) -> tuple:
+    """
+    Search every result of a query, past the search API's 1,000-result cap.
+    Returns (repos, complete), where complete is False if any shard or page failed.
+
+    The query is split into created: date ranges, halving any range whose
+    total_count is still above GITHUB_SEARCH_RESULT_CAP. A range's first page
+    doubles as its count; the remaining pages are fetched alongside the next
+    round of counts. All requests go through run_fetches, so they run
+    concurrently and are paced by the search rate-limit bucket.
+    """
+    start = datetime.fromisoformat(GITHUB_SEARCH_CREATED_SINCE)
+    # Two days past the run date covers any local-time offset of the run clock
+    end = (run_now().replace(tzinfo=None) + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    repos = []
+    pending = [(start, end)]
+    page_jobs = []
+    shards = failed = 0
+    while pending or page_jobs:
+        count_jobs = [(created_shard(query, low, high), 1) for low, high in pending]
+        results = run_fetches(github_search_page, count_jobs + page_jobs)
+
+        for response in results[len(count_jobs):]:
+            if not response or "items" not in response:
+                failed += 1
+                continue
+            repos.extend(response["items"])
+
+        ranges, pending, page_jobs = pending, [], []
+        for (low, high), (shard, _), response in zip(ranges, count_jobs, results):
+            if not response or "items" not in response:
+                failed += 1
+                continue
+            total = response.get("total_count", 0)
+            if total > GITHUB_SEARCH_RESULT_CAP and high - low > timedelta(seconds=1):
+                middle = low + timedelta(seconds=(high - low).total_seconds() // 2)
+                pending += [(low, middle), (middle + timedelta(seconds=1), high)]
+                continue
+            shards += 1
+            repos.extend(response["items"])
+            pages = -(-min(total, GITHUB_SEARCH_RESULT_CAP) // 100)
+            page_jobs += [(shard, page) for page in range(2, pages + 1)]
+
+    print(f"    {shards} created: date shards" + (f", {failed} failed requests" if failed else ""))
+    return repos, not failed
+
 def extract_package_refs(repo: Dict) -> tuple:
     """Try to infer npm/PyPI package names from repo metadata."""
     npm_pkg = None
@@ -66,46 +116,118 @@ SEARCH_QUERIES = [
     "model-context-protocol in:name"
 ]
 
+GITHUB_DISCOVERY_INDEX_VERSION = 1
+
+def github_repo_record(repo: Dict, discovered_date: str) -> Dict:
+    """Server row for a repository search result."""
+    npm_pkg, pypi_pkg = extract_package_refs(repo)
+    return {
+        "server_id": f"github_{repo.get('id')}",
+        "name": repo.get("name", ""),
+        "description": (repo.get("description", "") or "")[:500],
+        "repository": repo.get("html_url", ""),
+        "npm_package": npm_pkg,
+        "pypi_package": pypi_pkg,
+        # Both names are guesses from the repo; Cell 6 swaps in what the manifests declare
+        "npm_package_origin": "guess" if npm_pkg else None,
+        "pypi_package_origin": "guess" if pypi_pkg else None,
+        "categories": ",".join(repo.get("topics", [])),
+        "author": repo.get("owner", {}).get("login", ""),
+        "version": "",
+        "source": "github_search",
+        "discovered_date": discovered_date,
+        # Extra GitHub metadata
+        "github_stars": repo.get("stargazers_count", 0),
+        "github_forks": repo.get("forks_count", 0),
+        "github_open_issues": repo.get("open_issues_count", 0),
+        "github_language": repo.get("language", ""),
+        "github_updated_at": repo.get("updated_at", ""),
+        "github_created_at": repo.get("created_at", "")
+    }
+
+def load_discovery_index() -> Dict:
+    """
+    The known-repo index: {"repos": {repo_id: {"pushed_at": ..., "record": server row}},
+    "newest_pushed_at": ..., "last_full_sync": ...}.
+    """
+    try:
+        with gzip.open(GITHUB_DISCOVERY_INDEX_PATH, "rt", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, EOFError, ValueError):
+        return {}
+    return index if index.get("version") == GITHUB_DISCOVERY_INDEX_VERSION else {}
+
+def save_discovery_index(index: Dict):
+    directory = os.path.dirname(GITHUB_DISCOVERY_INDEX_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{GITHUB_DISCOVERY_INDEX_PATH}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({**index, "version": GITHUB_DISCOVERY_INDEX_VERSION}, f)
+    os.replace(tmp_path, GITHUB_DISCOVERY_INDEX_PATH)
+
 # Execute searches
 print("Searching GitHub for MCP repositories...")
-all_github_repos = []
+
+# Incremental runs need every matching result, so they rely on sharded search;
+# cassette runs must see exactly the recorded requests, so they always search in full
+discovery_incremental = GITHUB_DISCOVERY_INCREMENTAL and GITHUB_SEARCH_SHARDING and not HTTP_CASSETTE_MODE
+discovery_index = load_discovery_index() if discovery_incremental else {}
+known_repos = discovery_index.get("repos", {})
+last_full_sync = discovery_index.get("last_full_sync")
+full_sync = (
+    not known_repos or not last_full_sync
+    or (RUN_STARTED_AT - datetime.fromisoformat(last_full_sync)).days >= GITHUB_DISCOVERY_FULL_SYNC_DAYS
+)
+# pushed_at >= created_at, so one pushed: qualifier finds both new and updated repos
+pushed_since = None if full_sync else discovery_index.get("newest_pushed_at")
+if discovery_incremental:
+    mode = f"repos pushed since {pushed_since}" if pushed_since else "full search"
+    print(f"  Discovery: {mode} ({len(known_repos)} known repos)")
+
+discovered_date = RUN_STARTED_AT.strftime("%Y-%m-%d")
 seen_repo_ids = set()
+# This run's search results by (owner, repo), reused by Cell 6 instead of refetching the repos
+github_search_payloads = {}
+search_complete = True
 
 for query in SEARCH_QUERIES:
     print(f"  Searching: {query}")
-    repos = github_search_repos(query, max_results=100)
+    search = f"{query} pushed:>={pushed_since}" if pushed_since else query
+    if GITHUB_SEARCH_SHARDING:
+        repos, query_complete = github_search_sharded(search)
+        search_complete = search_complete and query_complete
+    else:
+        repos = github_search_repos(search, max_results=100)
 
     for repo in repos:
-        repo_id = repo.get("id")
+        repo_id = str(repo.get("id"))
         if repo_id not in seen_repo_ids:
             seen_repo_ids.add(repo_id)
-
-            npm_pkg, pypi_pkg = extract_package_refs(repo)
-
-            all_github_repos.append({
-                "server_id": f"github_{repo_id}",
-                "name": repo.get("name", ""),
-                "description": (repo.get("description", "") or "")[:500],
-                "repository": repo.get("html_url", ""),
-                "npm_package": npm_pkg,
-                "pypi_package": pypi_pkg,
-                "categories": ",".join(repo.get("topics", [])),
-                "author": repo.get("owner", {}).get("login", ""),
-                "version": "",
-                "source": "github_search",
-                "discovered_date": datetime.now().strftime("%Y-%m-%d"),
-                # Extra GitHub metadata
-                "github_stars": repo.get("stargazers_count", 0),
-                "github_forks": repo.get("forks_count", 0),
-                "github_open_issues": repo.get("open_issues_count", 0),
-                "github_language": repo.get("language", ""),
-                "github_updated_at": repo.get("updated_at", ""),
-                "github_created_at": repo.get("created_at", "")
-            })
-
-    print(f"    Found {len(repos)} repos, unique total: {len(all_github_repos)}")
-
-github_discovered_df = pd.DataFrame(all_github_repos)
+            github_search_payloads[(repo.get("owner", {}).get("login", "").lower(), repo.get("name", "").lower())] = repo
+            # Keep the date the repo was first discovered
+            known = known_repos.get(repo_id)
+            known_repos[repo_id] = {
+                "pushed_at": repo.get("pushed_at") or "",
+                "record": github_repo_record(repo, known["record"]["discovered_date"] if known else discovered_date),
+            }
+
+    print(f"    Found {len(repos)} repos, unique total: {len(seen_repo_ids)}")
+
+if full_sync and search_complete:
+    # Drop repos that no longer match any query
+    known_repos = {repo_id: entry for repo_id, entry in known_repos.items() if repo_id in seen_repo_ids}
+
+if discovery_incremental and search_complete:
+    save_discovery_index({
+        "repos": known_repos,
+        "newest_pushed_at": max((entry["pushed_at"] for entry in known_repos.values()), default=None),
+        "last_full_sync": RUN_STARTED_AT.isoformat(timespec="seconds") if full_sync else last_full_sync,
+    })
+elif discovery_incremental:
+    print("  Search incomplete - the next run repeats it")
+
+github_discovered_df = pd.DataFrame([entry["record"] for entry in known_repos.values()])
 print(f"\n✓ Discovered {len(github_discovered_df)} unique MCP repos from GitHub")
 
 # Show top repos by stars
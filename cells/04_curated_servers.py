@@ -134,7 +134,7 @@ curated_servers_df["description"] = curated_servers_df["company"] + " official M
 curated_servers_df["author"] = curated_servers_df["company"]
 curated_servers_df["version"] = ""
 curated_servers_df["source"] = "curated"
-curated_servers_df["discovered_date"] = datetime.now().strftime("%Y-%m-%d")
+curated_servers_df["discovered_date"] = RUN_STARTED_AT.strftime("%Y-%m-%d")
 curated_servers_df["categories"] = curated_servers_df["category"]
 
 # Select standard columns
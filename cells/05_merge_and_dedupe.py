@@ -1,47 +1,395 @@
 # Cell 5: Merge and Deduplicate Servers
 # Combines all discovery sources into a unified server list
 
+# Any other URL: the address without scheme, credentials, "www.", query, fragment,
+# trailing slash or ".git"
+OTHER_URL_PATTERN = re.compile(
+    r"^\s*(?:[a-z][a-z0-9+.-]*://)?(?:[^@/\s]+@)?(?:www\.)?([a-z0-9.-]+\.[a-z]{2,}(?:[:/][^?#\s]*)?)",
+    re.IGNORECASE,
+)
+
 def normalize_repo_url(url: str) -> str:
-    """Normalize GitHub URLs for comparison."""
-    if not url:
+    """
+    Normalize repository URLs for comparison, lowercased: "host/owner/repo" (plus
+    "/subdir" for a monorepo directory) on a code forge, the cleaned address on any
+    other host, or "" if there is none.
+    """
+    parsed = parse_repo_url(url)
+    if parsed:
+        return "/".join(part for part in parsed if part).lower()
+    match = OTHER_URL_PATTERN.match(url) if isinstance(url, str) else None
+    if not match:
         return ""
-    url = url.lower().strip()
-    url = url.replace("https://", "").replace("http://", "")
-    url = url.replace("www.", "")
-    url = url.rstrip("/")
-    url = url.replace(".git", "")
-    return url
-
-def merge_server_records(records: List[Dict]) -> Dict:
-    """Merge multiple records for the same server, preferring non-null values."""
-    if len(records) == 1:
-        return records[0]
-
-    merged = {}
-    # Priority order: curated > mcp_registry > github_search
-    priority_order = {"curated": 0, "mcp_registry": 1, "github_search": 2}
-    records_sorted = sorted(records, key=lambda x: priority_order.get(x.get("source", ""), 99))
-
-    for key in records[0].keys():
-        for rec in records_sorted:
-            val = rec.get(key)
-            if val is not None and val != "" and str(val) != "nan":
-                merged[key] = val
+    address = match.group(1).rstrip("/").lower()
+    return address[:-4] if address.endswith(".git") else address
+
+def normalize_repo_urls(urls: pd.Series) -> pd.Series:
+    """normalize_repo_url over a Series, parsing each distinct URL once."""
+    codes, uniques = pd.factorize(urls)
+    keys = np.array([normalize_repo_url(url) for url in uniques] + [""], dtype=object)
+    # Missing values have code -1, which picks the trailing ""
+    return pd.Series(keys[codes], index=urls.index, dtype=object)
+
+# Priority order when merging records of the same server: curated > mcp_registry > github_search
+SOURCE_PRIORITY = {"curated": 0, "mcp_registry": 1, "github_search": 2}
+
+def dedupe_records(combined_df: pd.DataFrame, key: str = "repo_normalized") -> pd.DataFrame:
+    """
+    Merge records that share a `key` value, preferring non-null values.
+
+    Rows are ranked by source priority and sorted once; each column then takes the
+    first value per key that is not None, NaN, "" or "nan". Merged rows get a
+    "sources" column listing every source they combine. Keys with a single record
+    and records with an empty key are kept unchanged.
+    """
+    has_key = combined_df[key] != ""
+    group_size = combined_df.groupby(key)[key].transform("size")
+    multi = has_key & (group_size > 1)
+    kept = combined_df[~multi]
+    dupes = combined_df[multi]
+
+    parts = [kept]
+    if not dupes.empty:
+        # Rank by source priority, keeping the original order within a rank
+        rank = dupes["source"].map(SOURCE_PRIORITY).fillna(99)
+        ranked = dupes.assign(_rank=rank).sort_values([key, "_rank"], kind="stable").drop(columns="_rank")
+
+        # Treat empty strings and "nan" like nulls, then take the first remaining value per key
+        blank = ranked.isna() | ranked.isin(["", "nan"])
+        merged = ranked.mask(blank).groupby(key, sort=True).first()
+        merged = merged.astype(object).where(merged.notna(), None)
+
+        # Sorted, de-duplicated list of the sources behind each merged record: one bit per
+        # source name, OR-ed per key (a sum, once duplicates are dropped), then mapped to labels.
+        # Records merged before carry all of their sources in "sources".
+        sources = dupes[[key, "source"]]
+        if "sources" in dupes.columns:
+            merged_before = dupes["sources"].notna() & (dupes["sources"] != "")
+            sources = sources.assign(source=dupes["source"].where(~merged_before, dupes["sources"]).str.split(","))
+            sources = sources.explode("source")
+        sources = sources[sources["source"].notna() & (sources["source"] != "")].drop_duplicates()
+        names = sorted(sources["source"].unique())
+        bits = sources["source"].map({name: 1 << i for i, name in enumerate(names)})
+        masks = bits.groupby(sources[key]).sum()
+        labels = {mask: ",".join(name for i, name in enumerate(names) if mask >> i & 1) for mask in masks.unique()}
+        merged["sources"] = masks.map(labels).reindex(merged.index).fillna("")
+        columns = list(combined_df.columns) + ([] if "sources" in combined_df.columns else ["sources"])
+        parts.append(merged.reset_index()[columns])
+
+    # Groups come out in key order, records without a key first
+    deduped = pd.concat(parts, ignore_index=True)
+    deduped = deduped.sort_values(key, kind="stable").reset_index(drop=True)
+
+    # Match the types of a frame built from the merged records: columns with no values are float NaN
+    deduped = deduped.infer_objects()
+    empty = deduped.columns[deduped.isna().all()]
+    deduped[empty] = deduped[empty].astype(float)
+    return deduped
+
+# ============================================================================
+# SERVER IDENTITY INDEX
+# ============================================================================
+
+IDENTITY_INDEX_VERSION = 3  # file format
+# Bump whenever parse_repo_url, normalize_repo_url or identity_keys derive keys differently:
+# links stored under the old keys are dropped, while ids of keys that still derive the same survive
+IDENTITY_KEYS_VERSION = 2
+
+class IdentityIndex:
+    """
+    Server identities from key links ("repo:...", "npm:...", "pypi:...", "registry:...").
+
+    Links are stored per provenance - the record or manifest that asserted them - and a
+    provenance's links are replaced whenever it is seen again, so a record whose repository
+    changes drops its old link. resolve() rebuilds the components from the current links
+    with a union-find (union by size, path halving), so nothing is merged for good. Only
+    the ids persist: each component takes the oldest id any of its keys had, and when a
+    server splits, the larger part keeps the id and the rest get new ones.
+    """
+
+    def __init__(self, state: Optional[Dict] = None):
+        state = state or {}
+        self.links: Dict[str, List[str]] = state.get("links", {})  # provenance -> keys it links
+        self.key_ids: Dict[str, str] = state.get("key_ids", {})  # key -> canonical id
+        self.id_seq: Dict[str, int] = state.get("id_seq", {})  # canonical id -> assignment order
+        self.last_full_sync: Optional[str] = state.get("last_full_sync")
+        self.seen: set = set()  # provenances linked in this run
+        self.id_keys: Dict[str, str] = {}  # canonical id -> one of its keys, after resolve()
+
+    def link(self, provenance: str, keys: List[str]):
+        """Replace the keys `provenance` links; a provenance seen twice in one run links both sets."""
+        if provenance in self.seen:
+            keys = list(dict.fromkeys(self.links[provenance] + keys))
+        self.links[provenance] = keys
+        self.seen.add(provenance)
+
+    def prune(self):
+        """
+        Drop links not asserted in this run. Manifest links come from Cell 6, after this
+        prune, so they are kept while a record of this run still has their repo (first key).
+        """
+        live_keys = {key for provenance in self.seen for key in self.links[provenance]}
+        self.links = {
+            provenance: keys for provenance, keys in self.links.items()
+            if provenance in self.seen or (provenance.startswith("manifest:") and keys[0] in live_keys)
+        }
+
+    def resolve(self):
+        """Rebuild the components from the current links and give each its canonical id."""
+        parent: Dict[str, str] = {}
+        size: Dict[str, int] = {}
+
+        def find(key: str) -> str:
+            if key not in parent:
+                parent[key] = key
+                size[key] = 1
+                return key
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for keys in self.links.values():
+            root = find(keys[0])
+            for key in keys[1:]:
+                other = find(key)
+                if other != root:
+                    if size[root] < size[other]:
+                        root, other = other, root
+                    parent[other] = root
+                    size[root] += size[other]
+
+        components: Dict[str, List[str]] = {}
+        for key in parent:
+            components.setdefault(find(key), []).append(key)
+
+        # Larger components claim their ids first, so a split leaves the id with the larger part
+        claimed = set()
+        self.id_keys = {}
+        for members in sorted(components.values(), key=lambda m: (-len(m), min(m))):
+            candidates = {self.key_ids[k] for k in members if k in self.key_ids} - claimed
+            if candidates:
+                canonical = min(candidates, key=lambda c: self.id_seq.get(c, 0))
+            else:
+                first = min(members)
+                canonical = f"srv_{hashlib.sha1(first.encode()).hexdigest()[:12]}"
+                if canonical in claimed or canonical in self.id_seq:
+                    canonical = f"srv_{hashlib.sha1(f'{first}#{len(self.id_seq)}'.encode()).hexdigest()[:12]}"
+                self.id_seq[canonical] = len(self.id_seq)
+            claimed.add(canonical)
+            self.id_keys[canonical] = members[0]
+            for key in members:
+                self.key_ids[key] = canonical
+
+    def canonical_id(self, key: str) -> str:
+        return self.key_ids[key]
+
+    def state(self) -> Dict:
+        return {"links": self.links, "key_ids": self.key_ids, "id_seq": self.id_seq,
+                "last_full_sync": self.last_full_sync}
+
+def load_identity_index() -> IdentityIndex:
+    try:
+        with gzip.open(IDENTITY_INDEX_PATH, "rt", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, EOFError, ValueError):
+        return IdentityIndex()
+    if state.get("version") != IDENTITY_INDEX_VERSION:
+        return IdentityIndex()
+    if state.get("keys_version") != IDENTITY_KEYS_VERSION:
+        # Links between keys that are now derived differently would be wrong; ids carry over
+        state = {**state, "links": {}, "last_full_sync": None}
+    return IdentityIndex(state)
+
+def save_identity_index(index: IdentityIndex):
+    directory = os.path.dirname(IDENTITY_INDEX_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{IDENTITY_INDEX_PATH}.tmp"
+    # Rewritten every run, so trade a little size for a much faster write than level 9
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump({**index.state(), "version": IDENTITY_INDEX_VERSION, "keys_version": IDENTITY_KEYS_VERSION}, f)
+    os.replace(tmp_path, IDENTITY_INDEX_PATH)
+
+def package_key(ecosystem: str, name: str) -> str:
+    """Identity key of a package; PyPI names are compared in their PEP 503 form."""
+    if ecosystem == "pypi":
+        name = re.sub(r"[-_.]+", "-", name)
+    return f"{ecosystem}:{name.lower()}"
+
+def identity_keys(df: pd.DataFrame) -> List[List[str]]:
+    """
+    Identity keys of each record: its normalized repo, registry id and declared packages.
+
+    Package names guessed from a repo name (origin "guess") don't link records; declared
+    ones do, whatever the record's source.
+    """
+    def values(col: str, mask: pd.Series) -> pd.Series:
+        # Object dtype keeps .str usable when a column holds nothing but NaN
+        column = df[col].astype(object)
+        return column.where(mask & column.notna() & ~column.isin(["", "nan"]))
+
+    declared = df["source"] != "github_search"
+    repo = df["repo_normalized"].where(df["repo_normalized"] != "").radd("repo:")
+    registry = values("server_id", df["source"] == "mcp_registry").radd("registry:")
+    npm = values("npm_package", df["npm_package_origin"] != "guess").str.lower().radd("npm:")
+    pypi = values("pypi_package", df["pypi_package_origin"] != "guess").str.replace(r"[-_.]+", "-", regex=True).str.lower().radd("pypi:")
+    # Full package lists from registry details ("npm:a,pypi:b")
+    packages = values("packages", declared)
+
+    keys = []
+    for row in zip(repo, registry, npm, pypi, packages):
+        row_keys = [k for k in row[:4] if isinstance(k, str)]
+        if isinstance(row[4], str):
+            for ref in row[4].split(","):
+                ecosystem, _, name = ref.strip().partition(":")
+                if ecosystem in ("npm", "pypi") and name:
+                    row_keys.append(package_key(ecosystem, name))
+        keys.append(row_keys)
+    return keys
+
+def assign_identities(df: pd.DataFrame, index: IdentityIndex, full_sync: bool = False) -> pd.Series:
+    """
+    Link each record's keys in `index`; returns each record's canonical id ("" without keys).
+    On a full sync, links that no record of `df` asserts any more are dropped first.
+    """
+    keys = identity_keys(df)
+    for source, server_id, row_keys in zip(df["source"], df["server_id"], keys):
+        if row_keys:
+            index.link(f"{source}:{server_id}", row_keys)
+    if full_sync:
+        index.prune()
+    # Ids are read after every link is in, so all records of one server get the same id
+    index.resolve()
+    return pd.Series([index.canonical_id(k[0]) if k else "" for k in keys], index=df.index, dtype=object)
+
+def link_declared_packages(server_ids: pd.Series, repositories: pd.Series, npm: pd.Series, pypi: pd.Series,
+                           index: IdentityIndex) -> pd.Series:
+    """
+    Link the packages a repo's manifest declares (Cell 6 reads them after the merge) to
+    its repo key, replacing what that manifest linked before, and return each server's
+    canonical id once they are in. Servers that share a declared package end up with the
+    same id; server ids that are not in `index` map to "". Rows without a repository
+    link nothing.
+    """
+    for repository, npm_name, pypi_name in zip(repositories, npm, pypi):
+        repo = normalize_repo_url(repository) if isinstance(repository, str) else ""
+        if not repo:
+            continue
+        keys = [f"repo:{repo}"] + [
+            package_key(ecosystem, name) for ecosystem, name in (("npm", npm_name), ("pypi", pypi_name))
+            if isinstance(name, str) and name not in ("", "nan")
+        ]
+        index.link(f"manifest:repo:{repo}", keys)
+    server_keys = [index.id_keys.get(server_id) for server_id in server_ids]
+    index.resolve()
+    return pd.Series([index.canonical_id(key) if key else "" for key in server_keys],
+                     index=server_ids.index, dtype=object)
+
+# ============================================================================
+# NEAR-DUPLICATE DETECTION
+# ============================================================================
+
+# MinHash signature length and LSH bands (rows per band = hashes / bands). 16 bands of 4
+# rows make any pair above ~0.5 Jaccard a likely candidate; candidates are then checked
+# against NEAR_DUPLICATE_THRESHOLD.
+NEAR_DUPLICATE_HASHES = 64
+NEAR_DUPLICATE_BANDS = 16
+MINHASH_EMPTY = np.iinfo(np.uint32).max  # signature of a text without words
+
+def minhash_signatures(texts: pd.Series, num_hashes: int = NEAR_DUPLICATE_HASHES, seed: int = 0) -> np.ndarray:
+    """
+    MinHash signatures (one row of `num_hashes` per text) over word bigrams, or the
+    word itself for one-word texts. Texts without words get MINHASH_EMPTY rows.
+    """
+    words = texts.reset_index(drop=True).str.lower().str.findall(r"[a-z0-9]+").explode().dropna()
+    doc = words.index.to_numpy(dtype=np.int64)
+    word_ids, vocabulary = pd.factorize(words.to_numpy(dtype=object))
+    word_ids = word_ids.astype(np.uint64)
+    vocab_size = np.uint64(len(vocabulary))
+
+    # Shingles as integers: a bigram is first * V + second, a lone word V * V + word
+    same_doc = doc[1:] == doc[:-1]
+    single = np.bincount(doc, minlength=len(texts))[doc] == 1
+    shingles = np.concatenate([
+        word_ids[:-1][same_doc] * vocab_size + word_ids[1:][same_doc],
+        vocab_size * vocab_size + word_ids[single],
+    ])
+    shingle_doc = np.concatenate([doc[:-1][same_doc], doc[single]])
+
+    # Group shingles by text so each hash function is one reduceat over all texts
+    order = np.argsort(shingle_doc, kind="stable")
+    shingles, shingle_doc = shingles[order], shingle_doc[order]
+    starts = np.flatnonzero(np.r_[True, shingle_doc[1:] != shingle_doc[:-1]]) if len(shingles) else order[:0]
+
+    # Multiply-shift hashing: the high 32 bits of a * x + b (mod 2^64) for random odd a
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, num_hashes, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, num_hashes, dtype=np.uint64)
+    signatures = np.full((len(texts), num_hashes), MINHASH_EMPTY, dtype=np.uint32)
+    hashed = np.empty_like(shingles)
+    for k in range(num_hashes):
+        if len(shingles):
+            np.multiply(shingles, a[k], out=hashed)
+            hashed += b[k]
+            hashed >>= np.uint64(32)
+            signatures[shingle_doc[starts], k] = np.minimum.reduceat(hashed, starts)
+    return signatures
+
+def connected_components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Component label (lowest member) of each of `n` nodes, given edges left[i]-right[i]."""
+    labels = np.arange(n)
+    while True:
+        # Compress every path to its root, then hook the larger root of each edge onto the smaller
+        while True:
+            parents = labels[labels]
+            if (parents == labels).all():
                 break
-        if key not in merged:
-            merged[key] = None
+            labels = parents
+        root_l, root_r = labels[left], labels[right]
+        split = root_l != root_r
+        if not split.any():
+            return labels
+        np.minimum.at(labels, np.maximum(root_l, root_r)[split], np.minimum(root_l, root_r)[split])
 
-    # Combine sources
-    sources = list(set(r.get("source", "") for r in records if r.get("source")))
-    merged["sources"] = ",".join(sources)
+def near_duplicate_clusters(texts: pd.Series, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> np.ndarray:
+    """
+    Cluster label of each text among its near duplicates (-1 when it has none).
 
-    return merged
+    Each LSH band buckets the signatures, and every bucket member is compared with the
+    bucket's first text only, so candidates grow linearly with the number of texts.
+    Pairs whose signatures agree on at least `threshold` of the hashes are linked.
+    """
+    signatures = minhash_signatures(texts)
+    n, rows = len(texts), NEAR_DUPLICATE_HASHES // NEAR_DUPLICATE_BANDS
+    has_words = (signatures != MINHASH_EMPTY).any(axis=1)
+    left, right = [], []
+    for band in range(NEAR_DUPLICATE_BANDS):
+        columns = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        bucket = columns[:, 0]
+        for j in range(1, rows):
+            bucket = bucket * np.uint64(1000003) ^ columns[:, j]
+        members = np.flatnonzero(has_words)
+        members = members[np.argsort(bucket[members], kind="stable")]
+        sorted_bucket = bucket[members]
+        first = np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]]
+        leaders = members[np.maximum.accumulate(np.where(first, np.arange(len(members)), 0))]
+        candidates = members != leaders
+        member, leader = members[candidates], leaders[candidates]
+        similar = (signatures[member] == signatures[leader]).mean(axis=1) >= threshold
+        left.append(member[similar])
+        right.append(leader[similar])
+
+    labels = connected_components(n, np.concatenate(left), np.concatenate(right))
+    sizes = np.bincount(labels, minlength=n)
+    return np.where(sizes[labels] > 1, labels, -1)
 
 # Prepare DataFrames with common columns
 common_cols = [
     "server_id", "name", "description", "repository",
     "npm_package", "pypi_package", "categories", "author",
-    "version", "source", "discovered_date"
+    "version", "source", "discovered_date", "packages",
+    "npm_package_origin", "pypi_package_origin"
 ]
 
 # Ensure all dataframes have required columns
@@ -78,38 +426,81 @@ if not all_sources:
 combined_df = pd.concat(all_sources, ignore_index=True)
 print(f"\nTotal before deduplication: {len(combined_df)}")
 
+# Where each package name came from: "guess" (Cell 3, from the repo name) or "declared".
+# An origin is set exactly where a name is, so dedupe_records takes both from one record.
+for column in ("npm_package", "pypi_package"):
+    names = combined_df[column].astype(object)
+    has_name = names.notna() & ~names.isin(["", "nan"])
+    origin = combined_df[f"{column}_origin"].where(
+        combined_df[f"{column}_origin"].notna(),
+        pd.Series(np.where(combined_df["source"] == "github_search", "guess", "declared"), index=combined_df.index),
+    )
+    combined_df[f"{column}_origin"] = origin.where(has_name, None)
+
 # Add normalized repo URL for deduplication
-combined_df["repo_normalized"] = combined_df["repository"].apply(normalize_repo_url)
-
-# Group by normalized repo URL and merge
-deduped_records = []
-repo_groups = combined_df.groupby("repo_normalized")
-
-for repo_url, group in repo_groups:
-    if not repo_url:  # Skip empty repos
-        # Keep all records without repo URLs
-        for _, row in group.iterrows():
-            deduped_records.append(row.to_dict())
-    else:
-        # Merge records with same repo
-        records = group.to_dict("records")
-        merged = merge_server_records(records)
-        deduped_records.append(merged)
-
-# Create deduplicated DataFrame
-servers_master_df = pd.DataFrame(deduped_records)
-
-# Generate unique server_id if missing
-servers_master_df["server_id"] = servers_master_df.apply(
-    lambda x: x["server_id"] if pd.notna(x["server_id"]) and x["server_id"]
-    else x["name"].lower().replace(" ", "_")[:50] if pd.notna(x["name"])
-    else f"server_{hash(str(x['repository']))}"[:20],
-    axis=1
+combined_df["repo_normalized"] = normalize_repo_urls(combined_df["repository"])
+
+# Link records that share a repo, registry id or declared package into one identity.
+# Cassette runs start from an empty index so replays stay deterministic.
+identity_persist = bool(IDENTITY_INDEX_PATH) and not HTTP_CASSETTE_MODE
+identity_index = load_identity_index() if identity_persist else IdentityIndex()
+known_keys = len(identity_index.key_ids)
+last_identity_sync = identity_index.last_full_sync
+identity_full_sync = (
+    not last_identity_sync
+    or (RUN_STARTED_AT - datetime.fromisoformat(last_identity_sync)).days >= IDENTITY_FULL_SYNC_DAYS
 )
+combined_df["identity"] = assign_identities(combined_df, identity_index, full_sync=identity_full_sync)
+if identity_full_sync:
+    identity_index.last_full_sync = RUN_STARTED_AT.isoformat(timespec="seconds")
+if identity_persist:
+    save_identity_index(identity_index)
+print(f"  Identity index: {len(identity_index.key_ids)} keys ({len(identity_index.key_ids) - known_keys} new), "
+      f"{len(identity_index.id_keys)} servers")
+
+# Merge records of the same identity in one columnar pass
+servers_master_df = dedupe_records(combined_df, key="identity")
+
+# Canonical ids are stable across runs; records without any identity key keep their own
+identity = servers_master_df["identity"]
+servers_master_df["server_id"] = identity.where(identity != "", servers_master_df["server_id"])
+
+# Generate unique server_id if missing: from the name, else a hash of the repository
+server_ids = servers_master_df["server_id"]
+names = servers_master_df["name"]
+from_name = names.str.lower().str.replace(" ", "_", regex=False).str[:50]
+needs_hash = (server_ids.isna() | (server_ids == "")) & names.isna()
+from_repo = servers_master_df.loc[needs_hash, "repository"].map(
+    lambda repo: f"server_{hashlib.sha1(str(repo).encode()).hexdigest()}"[:20]
+)
+servers_master_df["server_id"] = server_ids.where(
+    server_ids.notna() & (server_ids != ""), from_name.where(names.notna(), from_repo)
+)
+
+# Near-duplicates among servers without a repo URL (forks, mirrors, re-listed entries)
+no_repo = servers_master_df.index[servers_master_df["repo_normalized"].fillna("") == ""]
+near_duplicate_clusters_df = pd.DataFrame(columns=["cluster", "server_id", "name", "author", "source"])
+if len(no_repo) > 1:
+    def text(col: str) -> pd.Series:
+        values = servers_master_df.loc[no_repo, col].astype(object)
+        return values.where(values.notna(), "").astype(str)
+
+    clusters = near_duplicate_clusters(text("name") + " " + text("description") + " " + text("author"))
+    clustered = no_repo[clusters >= 0]
+    near_duplicate_clusters_df = servers_master_df.loc[clustered, ["server_id", "name", "author", "source"]]
+    near_duplicate_clusters_df.insert(0, "cluster", no_repo[clusters[clusters >= 0]])
+    near_duplicate_clusters_df = near_duplicate_clusters_df.sort_values("cluster", kind="stable")
+    print(f"  Near-duplicates: {near_duplicate_clusters_df['cluster'].nunique()} clusters "
+          f"of {len(near_duplicate_clusters_df)} servers without a repo URL")
+
+    if NEAR_DUPLICATE_MERGE and len(near_duplicate_clusters_df):
+        servers_master_df["near_duplicate"] = ""
+        servers_master_df.loc[clustered, "near_duplicate"] = [f"dup_{c}" for c in no_repo[clusters[clusters >= 0]]]
+        servers_master_df = dedupe_records(servers_master_df, key="near_duplicate")
+        servers_master_df = servers_master_df.drop(columns=["near_duplicate"])
 
 # Clean up
-if "repo_normalized" in servers_master_df.columns:
-    servers_master_df = servers_master_df.drop(columns=["repo_normalized"])
+servers_master_df = servers_master_df.drop(columns=["repo_normalized", "identity"], errors="ignore")
 
 print(f"✓ After deduplication: {len(servers_master_df)} unique servers")
 
@@ -1,29 +1,42 @@
 # Cell 6: Fetch GitHub Repository Metrics
 # Enriches servers with detailed GitHub metrics
 
+# GitHub answers stats endpoints with 202 Accepted while it computes them in the
+# background; such repos are parked and re-polled in later sweeps.
+COMMIT_STATS_MAX_SWEEPS = 4
+COMMIT_STATS_SWEEP_INTERVAL = 15  # seconds between sweeps
+
+# With a token, repo metrics come from GraphQL in batches of up to 100 repos per query
+USE_GRAPHQL_METRICS = bool(GITHUB_TOKENS)
+GRAPHQL_BATCH_SIZE = 100
+
+# Search results (Cell 3) carry the REST repo fields; those missing these are fetched in full
+SEARCH_PAYLOAD_REQUIRED_FIELDS = ["license", "archived", "pushed_at"]
+
+# Replace guessed npm/PyPI names with those declared in package.json, pyproject.toml or setup.py.
+# Manifests are read in GraphQL batches and cached per repo by default-branch commit SHA.
+RESOLVE_MANIFEST_PACKAGES = USE_GRAPHQL_METRICS
+MANIFEST_CACHE_PATH = ".cache/github/manifests.json"
+
 def extract_github_owner_repo(url: str) -> tuple:
     """Extract owner and repo name from GitHub URL."""
-    if not url or "github.com" not in url:
+    parsed = parse_repo_url(url)
+    if not parsed or parsed[0] != "github.com":
         return None, None
-
-    # Clean URL
-    url = url.replace("https://", "").replace("http://", "")
-    url = url.replace("www.", "").replace("github.com/", "")
-    url = url.rstrip("/").replace(".git", "")
-
-    parts = url.split("/")
-    if len(parts) >= 2:
-        return parts[0], parts[1]
-    return None, None
+    return parsed[1], parsed[2]
 
 def fetch_github_repo_metrics(owner: str, repo: str) -> Optional[Dict]:
     """Fetch detailed metrics for a GitHub repository."""
     url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}"
-    data = safe_request(url, delay=GITHUB_RATE_LIMIT_DELAY)
+    data = safe_request(url)
 
     if not data:
         return None
 
+    return parse_rest_repo_metrics(data)
+
+def parse_rest_repo_metrics(data: Dict) -> Dict:
+    """Map a REST repository payload (GET /repos or a search result item) onto the metrics schema."""
     return {
         "github_stars": data.get("stargazers_count", 0),
         "github_forks": data.get("forks_count", 0),
@@ -41,10 +54,270 @@ def fetch_github_repo_metrics(owner: str, repo: str) -> Optional[Dict]:
         "github_topics": ",".join(data.get("topics", []))
     }
 
-def fetch_github_commit_activity(owner: str, repo: str) -> Dict:
-    """Fetch recent commit activity."""
+def search_payload_metrics(payload: Dict) -> Optional[Dict]:
+    """Repo metrics from a search result item, or None if it lacks SEARCH_PAYLOAD_REQUIRED_FIELDS."""
+    if any(field not in payload for field in SEARCH_PAYLOAD_REQUIRED_FIELDS):
+        return None
+    return parse_rest_repo_metrics(payload)
+
+GRAPHQL_FRAGMENTS = {
+    "RepoMetrics": """
+fragment RepoMetrics on Repository {
+  stargazerCount
+  forkCount
+  watchers { totalCount }
+  issues(states: OPEN) { totalCount }
+  pullRequests(states: OPEN) { totalCount }
+  diskUsage
+  primaryLanguage { name }
+  licenseInfo { spdxId }
+  defaultBranchRef { name }
+  createdAt
+  updatedAt
+  pushedAt
+  isArchived
+  isDisabled
+  repositoryTopics(first: 20) { nodes { topic { name } } }
+  mentionableUsers { totalCount }
+}
+""",
+    # What a search result lacks or may not carry: freshness fields, the contributor proxy,
+    # and watchers (REST watchers_count repeats the star count)
+    "SearchGaps": """
+fragment SearchGaps on Repository {
+  watchers { totalCount }
+  licenseInfo { spdxId }
+  isArchived
+  pushedAt
+  mentionableUsers { totalCount }
+}
+""",
+    # Commit counts on the default branch for rolling 7- and 28-day windows
+    "CommitWindows": """
+fragment CommitWindows on Repository {
+  defaultBranchRef {
+    target {
+      ... on Commit {
+        oid
+        commitsLastWeek: history(since: $since7) { totalCount }
+        commitsLast4Weeks: history(since: $since28) { totalCount }
+      }
+    }
+  }
+}
+""",
+    # Package manifests at the head of the default branch
+    "Manifests": """
+fragment Manifests on Repository {
+  packageJson: object(expression: "HEAD:package.json") { ... on Blob { text } }
+  pyprojectToml: object(expression: "HEAD:pyproject.toml") { ... on Blob { text } }
+  setupPy: object(expression: "HEAD:setup.py") { ... on Blob { text } }
+}
+""",
+}
+
+def build_repo_batch_query(batch_size: int, fragments: List[str]) -> str:
+    """Build a query with one aliased repository() lookup per repo (r0, r1, ...)."""
+    var_defs = [f"$o{i}: String!, $n{i}: String!" for i in range(batch_size)]
+    if "CommitWindows" in fragments:
+        var_defs.append("$since7: GitTimestamp!, $since28: GitTimestamp!")
+    spreads = " ".join(f"...{name}" for name in fragments)
+    aliases = "\n".join(
+        f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{ {spreads} }}" for i in range(batch_size)
+    )
+    definitions = "".join(GRAPHQL_FRAGMENTS[name] for name in fragments)
+    return f"query({', '.join(var_defs)}) {{\n{aliases}\n}}\n{definitions}"
+
+def parse_graphql_repo_metrics(node: Dict) -> Dict:
+    """Map a GraphQL repository node onto the fetch_github_repo_metrics schema."""
+    return {
+        "github_stars": node.get("stargazerCount", 0),
+        "github_forks": node.get("forkCount", 0),
+        "github_watchers": (node.get("watchers") or {}).get("totalCount", 0),
+        # REST open_issues_count includes open pull requests
+        "github_open_issues": (node.get("issues") or {}).get("totalCount", 0)
+                              + (node.get("pullRequests") or {}).get("totalCount", 0),
+        "github_size_kb": node.get("diskUsage") or 0,
+        "github_language": (node.get("primaryLanguage") or {}).get("name", ""),
+        "github_license": (node.get("licenseInfo") or {}).get("spdxId"),
+        "github_default_branch": (node.get("defaultBranchRef") or {}).get("name", "main"),
+        "github_created_at": node.get("createdAt", ""),
+        "github_updated_at": node.get("updatedAt", ""),
+        "github_pushed_at": node.get("pushedAt", ""),
+        "github_archived": node.get("isArchived", False),
+        "github_disabled": node.get("isDisabled", False),
+        "github_topics": ",".join(
+            t["topic"]["name"] for t in (node.get("repositoryTopics") or {}).get("nodes", []) if t.get("topic")
+        ),
+        # GraphQL has no contributor count; users who can be @mentioned is the closest proxy
+        "github_contributors": (node.get("mentionableUsers") or {}).get("totalCount", 0),
+    }
+
+def parse_graphql_search_gaps(node: Dict) -> Dict:
+    """Map SearchGaps fields onto the metrics schema."""
+    return {
+        "github_watchers": (node.get("watchers") or {}).get("totalCount", 0),
+        "github_license": (node.get("licenseInfo") or {}).get("spdxId"),
+        "github_pushed_at": node.get("pushedAt", ""),
+        "github_archived": node.get("isArchived", False),
+        "github_contributors": (node.get("mentionableUsers") or {}).get("totalCount", 0),
+    }
+
+def parse_graphql_commit_windows(node: Dict) -> Dict:
+    """Map CommitWindows history counts onto the fetch_github_commit_activity schema."""
+    target = (node.get("defaultBranchRef") or {}).get("target") or {}
+    return {
+        "commits_last_week": (target.get("commitsLastWeek") or {}).get("totalCount", 0),
+        "commits_last_4_weeks": (target.get("commitsLast4Weeks") or {}).get("totalCount", 0),
+        "github_head_sha": target.get("oid"),
+    }
+
+def fetch_github_repo_batch(repos: List[tuple], fragments: List[str]) -> Optional[Dict[tuple, Optional[Dict]]]:
+    """
+    Query up to GRAPHQL_BATCH_SIZE (owner, repo) pairs in one GraphQL request.
+
+    Returns {(owner, repo): repository node or None if not found}, or None if the query failed.
+    """
+    variables = {}
+    for i, (owner, repo) in enumerate(repos):
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = repo
+    if "CommitWindows" in fragments:
+        now = run_now().astimezone()
+        variables["since7"] = (now - timedelta(days=7)).isoformat(timespec="seconds")
+        variables["since28"] = (now - timedelta(days=28)).isoformat(timespec="seconds")
+
+    data = graphql_request(build_repo_batch_query(len(repos), fragments), variables)
+    if data is None:
+        return None
+    return {key: data.get(f"r{i}") for i, key in enumerate(repos)}
+
+def fetch_github_repo_nodes_bulk(repos: List[tuple], fragments: List[str]) -> Dict[tuple, Optional[Dict]]:
+    """
+    Query many repos via batched GraphQL requests, run concurrently.
+
+    Repos from failed batches are left out so callers can fall back to REST.
+    """
+    unique_repos = list(dict.fromkeys(repos))
+    batches = [unique_repos[i:i+GRAPHQL_BATCH_SIZE] for i in range(0, len(unique_repos), GRAPHQL_BATCH_SIZE)]
+    print(f"  Fetching {len(unique_repos)} repos in {len(batches)} GraphQL queries")
+
+    results = {}
+    for batch_result in run_fetches(fetch_github_repo_batch, [(batch, fragments) for batch in batches]):
+        if batch_result:
+            results.update(batch_result)
+    return results
+
+def fetch_github_repo_metrics_bulk(repos: List[tuple]) -> Dict[tuple, Optional[Dict]]:
+    """Repo metrics plus 7/28-day commit counts for many repos; None marks repos not found."""
+    nodes = fetch_github_repo_nodes_bulk(repos, ["RepoMetrics", "CommitWindows"])
+    return {
+        key: {**parse_graphql_repo_metrics(node), **parse_graphql_commit_windows(node)} if node else None
+        for key, node in nodes.items()
+    }
+
+def fetch_github_search_metrics_bulk(payloads: Dict[tuple, Dict]) -> Dict[tuple, Optional[Dict]]:
+    """
+    Metrics for repos found by this run's search: the payload's fields, completed by one
+    SearchGaps + CommitWindows query per batch instead of the full RepoMetrics lookup.
+    """
+    nodes = fetch_github_repo_nodes_bulk(list(payloads), ["SearchGaps", "CommitWindows"])
+    return {
+        key: {**parse_rest_repo_metrics(payloads[key]), **parse_graphql_search_gaps(node),
+              **parse_graphql_commit_windows(node)} if node else None
+        for key, node in nodes.items()
+    }
+
+def fetch_github_commit_windows_bulk(repos: List[tuple]) -> Dict[tuple, Dict]:
+    """commits_last_week / commits_last_4_weeks for many repos from history(since:) counts."""
+    nodes = fetch_github_repo_nodes_bulk(repos, ["CommitWindows"])
+    return {key: parse_graphql_commit_windows(node) for key, node in nodes.items() if node}
+
+def parse_package_json_name(text: Optional[str]) -> Optional[str]:
+    """The npm name declared in package.json; None for private or unnamed packages."""
+    try:
+        manifest = json.loads(text or "")
+    except ValueError:
+        return None
+    if not isinstance(manifest, dict) or manifest.get("private"):
+        return None
+    name = manifest.get("name")
+    return name if isinstance(name, str) and name else None
+
+def parse_python_package_name(pyproject: Optional[str], setup_py: Optional[str]) -> Optional[str]:
+    """The PyPI name from pyproject.toml ([project] or [tool.poetry]) or a literal setup(name=...)."""
+    name = None
+    section = None
+    for line in (pyproject or "").splitlines():
+        line = line.strip()
+        if line.startswith("["):
+            section = line.strip("[] ")
+        elif section in ("project", "tool.poetry"):
+            match = re.match(r"name\s*=\s*[\"']([^\"']+)[\"']", line)
+            if match:
+                name = match.group(1)
+                break
+    if not name and setup_py:
+        call = setup_py[setup_py.find("setup("):] if "setup(" in setup_py else ""
+        match = re.search(r"\bname\s*=\s*[\"']([^\"']+)[\"']", call)
+        name = match.group(1) if match else None
+    # PyPI names are case-insensitive and treat runs of -, _ and . alike (PEP 503)
+    return re.sub(r"[-_.]+", "-", name).lower() if name else None
+
+def parse_graphql_manifests(node: Dict) -> Dict:
+    """Declared npm and PyPI package names from a Manifests node."""
+    def text(field):
+        return (node.get(field) or {}).get("text")
+    return {
+        "npm": parse_package_json_name(text("packageJson")),
+        "pypi": parse_python_package_name(text("pyprojectToml"), text("setupPy")),
+    }
+
+def load_manifest_cache() -> Dict[str, Dict]:
+    """Declared packages per repo as {"owner/repo": {"sha": ..., "npm": ..., "pypi": ...}}."""
+    try:
+        with open(MANIFEST_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def resolve_manifest_packages(heads: Dict[tuple, str]) -> Dict[tuple, Dict]:
+    """
+    Declared packages for {(owner, repo): head commit SHA}.
+
+    Only repos whose head moved since they were last read are queried, in batched
+    Manifests lookups; repos whose query failed are left out.
+    """
+    # Cassette runs must see exactly the recorded requests, so they always read every manifest
+    use_cache = bool(MANIFEST_CACHE_PATH) and not HTTP_CASSETTE_MODE
+    cache = load_manifest_cache() if use_cache else {}
+    stale = [key for key, sha in heads.items() if cache.get(f"{key[0]}/{key[1]}".lower(), {}).get("sha") != sha]
+    if stale:
+        for key, node in fetch_github_repo_nodes_bulk(stale, ["Manifests"]).items():
+            if node is not None:
+                cache[f"{key[0]}/{key[1]}".lower()] = {"sha": heads[key], **parse_graphql_manifests(node)}
+        if use_cache:
+            _write_atomic(MANIFEST_CACHE_PATH, json.dumps(cache))
+    print(f"  Package manifests: {len(heads) - len(stale)} cached, {len(stale)} read")
+
+    resolved = {}
+    for key, sha in heads.items():
+        entry = cache.get(f"{key[0]}/{key[1]}".lower())
+        if entry and entry["sha"] == sha:
+            resolved[key] = entry
+    return resolved
+
+def fetch_github_commit_activity(owner: str, repo: str) -> Optional[Dict]:
+    """Fetch recent commit activity. Returns None while GitHub is still computing the stats (202)."""
     url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/stats/commit_activity"
-    data = safe_request(url, delay=GITHUB_RATE_LIMIT_DELAY)
+    try:
+        response = http_get(url)
+        if response.status_code == 202:
+            return None
+        data = response.json() if response.ok else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Request failed for {url}: {e}")
+        data = None
 
     if not data or not isinstance(data, list):
         return {"commits_last_week": 0, "commits_last_4_weeks": 0}
@@ -59,18 +332,36 @@ def fetch_github_commit_activity(owner: str, repo: str) -> Dict:
         "commits_last_4_weeks": commits_4w
     }
 
+def poll_pending_commit_activity(results: List[Optional[Dict]]):
+    """Re-poll commit stats for repos that got a 202, in sweeps, updating results in place."""
+    pending = [i for i, m in enumerate(results) if m and m.get("commit_stats_pending")]
+
+    for sweep in range(1, COMMIT_STATS_MAX_SWEEPS + 1):
+        if not pending:
+            break
+        print(f"  Sweep {sweep}: waiting {COMMIT_STATS_SWEEP_INTERVAL}s, then re-polling commit stats for {len(pending)} repos")
+        api_sleep(COMMIT_STATS_SWEEP_INTERVAL)
+
+        jobs = [(results[i]["github_owner"], results[i]["github_repo"]) for i in pending]
+        still_pending = []
+        for i, stats in zip(pending, run_fetches(fetch_github_commit_activity, jobs)):
+            if stats is None:
+                still_pending.append(i)
+            else:
+                results[i].update(stats)
+                results[i]["commit_stats_pending"] = False
+        pending = still_pending
+
+    if pending:
+        print(f"  Commit stats still being computed for {len(pending)} repos (left empty)")
+
 def fetch_github_contributors_count(owner: str, repo: str) -> int:
     """Fetch contributor count (first page only for efficiency)."""
     url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/contributors"
     params = {"per_page": 1, "anon": "false"}
-    headers = {}
 
     try:
-        if GITHUB_TOKEN:
-            headers["Authorization"] = f"token {GITHUB_TOKEN}"
-
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-        time.sleep(GITHUB_RATE_LIMIT_DELAY)
+        response = http_get(url, params=params)
 
         # Get count from Link header
         link_header = response.headers.get("Link", "")
@@ -84,53 +375,174 @@ def fetch_github_contributors_count(owner: str, repo: str) -> int:
     except:
         return 0
 
+def fetch_github_server_metrics(server_id: str, owner: str, repo: str, include_contributors: bool,
+                                repo_metrics: Optional[Dict] = None, commit_stats: Optional[Dict] = None) -> Dict:
+    """
+    Fetch repo metrics, commit activity and (optionally) contributors for one server.
+
+    Pass repo_metrics (e.g. from the GraphQL bulk fetch) to skip the REST lookups it already covers,
+    and commit_stats (e.g. from fetch_github_commit_windows_bulk) to skip stats/commit_activity.
+    """
+    print(f"  Fetching: {owner}/{repo}")
+    metrics = dict(repo_metrics) if repo_metrics else fetch_github_repo_metrics(owner, repo)
+
+    if not metrics:
+        return {"server_id": server_id, "has_github": False}
+
+    # Add commit activity unless GraphQL already counted it (202 responses are parked for a later sweep)
+    if "commits_last_4_weeks" not in metrics:
+        if commit_stats is None:
+            commit_stats = fetch_github_commit_activity(owner, repo)
+        if commit_stats is None:
+            commit_stats = {"commits_last_week": None, "commits_last_4_weeks": None, "commit_stats_pending": True}
+        metrics.update(commit_stats)
+
+    # Add contributor count (expensive, sample for large datasets)
+    if include_contributors and "github_contributors" not in metrics:
+        metrics["github_contributors"] = fetch_github_contributors_count(owner, repo)
+
+    metrics["server_id"] = server_id
+    metrics["has_github"] = True
+    metrics["github_owner"] = owner
+    metrics["github_repo"] = repo
+    return metrics
+
 # Enrich servers with GitHub metrics
 print("Fetching GitHub metrics for servers...")
 print(f"Processing {len(servers_master_df)} servers (this may take a while due to rate limits)...")
 
 github_metrics_list = []
+github_jobs = []
+include_contributors = len(servers_master_df) <= 50  # Only fetch for small datasets
 
-for idx, row in servers_master_df.iterrows():
-    repo_url = row.get("repository", "")
-    owner, repo = extract_github_owner_repo(repo_url)
-
-    if not owner or not repo:
+# Parsed once per distinct URL (shared with Cell 5 through parse_repo_url's cache)
+repo_refs = parse_repo_urls(servers_master_df["repository"])
+on_github = repo_refs["host"] == "github.com"
+for server_id, github, owner, repo in zip(servers_master_df["server_id"], on_github, repo_refs["owner"], repo_refs["repo"]):
+    if not github:
         github_metrics_list.append({
-            "server_id": row["server_id"],
+            "server_id": server_id,
             "has_github": False
         })
         continue
 
-    print(f"  [{idx+1}/{len(servers_master_df)}] Fetching: {owner}/{repo}")
+    github_jobs.append((server_id, owner, repo, include_contributors))
 
-    # Fetch basic metrics
-    metrics = fetch_github_repo_metrics(owner, repo)
+# Repos found by this run's search already have most metrics in their search payload
+search_payloads = github_search_payloads if "github_search_payloads" in dir() else {}
+reused_payloads = {}
+for job in github_jobs:
+    payload = search_payloads.get((job[1].lower(), job[2].lower()))
+    if payload:
+        reused_payloads[(job[1], job[2])] = payload
+if reused_payloads:
+    print(f"  Reusing search results for {len(reused_payloads)} repos")
 
-    if not metrics:
-        github_metrics_list.append({
-            "server_id": row["server_id"],
-            "has_github": False
-        })
-        continue
+# Bulk-fetch repo metrics via GraphQL; repos missing from the result fall back to REST
+if USE_GRAPHQL_METRICS and github_jobs:
+    full_lookups = [(job[1], job[2]) for job in github_jobs if (job[1], job[2]) not in reused_payloads]
+    bulk_metrics = fetch_github_repo_metrics_bulk(full_lookups) if full_lookups else {}
+    if reused_payloads:
+        bulk_metrics.update(fetch_github_search_metrics_bulk(reused_payloads))
+    # Repos from failed batches fall back to REST for their metrics, but their commit
+    # counts get another GraphQL try instead of stats/commit_activity and its 202s
+    unresolved = [(job[1], job[2]) for job in github_jobs if (job[1], job[2]) not in bulk_metrics]
+    commit_windows = fetch_github_commit_windows_bulk(unresolved) if unresolved else {}
+    resolved_jobs = []
+    for job in github_jobs:
+        key = (job[1], job[2])
+        if key in bulk_metrics and bulk_metrics[key] is None:
+            # GraphQL reported the repo as not found - REST would 404 as well
+            github_metrics_list.append({"server_id": job[0], "has_github": False})
+            continue
+        resolved_jobs.append(job + (bulk_metrics.get(key), commit_windows.get(key)))
+    github_jobs = resolved_jobs
+elif reused_payloads:
+    # REST: complete search payloads replace the /repos lookup
+    github_jobs = [
+        job + (search_payload_metrics(reused_payloads[(job[1], job[2])]),) if (job[1], job[2]) in reused_payloads
+        else job
+        for job in github_jobs
+    ]
 
-    # Add commit activity
-    commit_stats = fetch_github_commit_activity(owner, repo)
-    metrics.update(commit_stats)
+# Fetch all repos concurrently (bounded by the per-host limits in Cell 1)
+github_results = run_fetches(fetch_github_server_metrics, github_jobs)
 
-    # Add contributor count (expensive, sample for large datasets)
-    if len(servers_master_df) <= 50:  # Only fetch for small datasets
-        metrics["github_contributors"] = fetch_github_contributors_count(owner, repo)
+# Targeted re-fetch of repos whose requests still failed after retrying
+repos_prefix = f"{GITHUB_API_BASE}/repos/"
+failed_repos = {
+    "/".join(d["url"][len(repos_prefix):].split("/")[:2])
+    for d in take_dead_letters(repos_prefix)
+}
+refetch_idx = [i for i, job in enumerate(github_jobs) if f"{job[1]}/{job[2]}" in failed_repos]
+if refetch_idx:
+    print(f"\nRe-fetching {len(refetch_idx)} repos that failed after retries...")
+    refetched = run_fetches(fetch_github_server_metrics, [github_jobs[i] for i in refetch_idx])
+    for i, metrics in zip(refetch_idx, refetched):
+        github_results[i] = metrics
 
-    metrics["server_id"] = row["server_id"]
-    metrics["has_github"] = True
-    metrics["github_owner"] = owner
-    metrics["github_repo"] = repo
+# Re-poll repos whose commit stats were still being computed
+poll_pending_commit_activity(github_results)
 
-    github_metrics_list.append(metrics)
+for job, metrics in zip(github_jobs, github_results):
+    if metrics:
+        # Sweep bookkeeping, not a metric
+        metrics.pop("commit_stats_pending", None)
+    github_metrics_list.append(metrics or {"server_id": job[0], "has_github": False})
 
 github_metrics_df = pd.DataFrame(github_metrics_list)
 print(f"\n✓ Fetched GitHub metrics for {github_metrics_df['has_github'].sum()} repositories")
 
+# Swap guessed package names for the ones the repos' manifests declare, before Cells 7 and 8 use them
+if RESOLVE_MANIFEST_PACKAGES and "github_head_sha" in github_metrics_df.columns:
+    print("\nResolving package names from repo manifests...")
+    with_head = github_metrics_df.dropna(subset=["github_head_sha"])
+    heads = dict(zip(zip(with_head["github_owner"], with_head["github_repo"]), with_head["github_head_sha"]))
+    declared = resolve_manifest_packages(heads)
+    manifests = pd.DataFrame([
+        {"server_id": server_id, **declared[key]}
+        for server_id, key in zip(with_head["server_id"], zip(with_head["github_owner"], with_head["github_repo"]))
+        if key in declared
+    ], columns=["server_id", "sha", "npm", "pypi"]).drop_duplicates("server_id").set_index("server_id")
+
+    has_manifest = servers_master_df["server_id"].isin(manifests.index)
+    # Guessed names (Cell 3's, whichever record they survived dedupe in) are replaced, or dropped
+    # if nothing is declared; declared names from the registry or curated list are only filled in
+    for column, registry in (("npm_package", "npm"), ("pypi_package", "pypi")):
+        origin = servers_master_df[f"{column}_origin"]
+        missing = servers_master_df[column].isna() | (servers_master_df[column] == "")
+        update = has_manifest & ((origin == "guess") | missing)
+        manifest_names = servers_master_df["server_id"].map(manifests[registry])
+        servers_master_df[column] = servers_master_df[column].where(~update, manifest_names)
+        servers_master_df[f"{column}_origin"] = origin.where(
+            ~update, manifest_names.where(manifest_names.isna(), "declared")
+        )
+    print(f"✓ Declared packages for {int(has_manifest.sum())} servers: "
+          f"{int(manifests['npm'].notna().sum())} npm, {int(manifests['pypi'].notna().sum())} PyPI")
+
+    # Declared names can show that servers Cell 5 kept apart are one, e.g. a registry entry known
+    # only by its npm name and the search hit for its repo: link them and merge those servers
+    if "identity_index" in dir():
+        merged_ids = link_declared_packages(
+            servers_master_df["server_id"], servers_master_df["repository"].where(has_manifest),
+            servers_master_df["npm_package"], servers_master_df["pypi_package"], identity_index,
+        )
+        renamed = (merged_ids != "") & (merged_ids != servers_master_df["server_id"])
+        if renamed.any():
+            new_ids = dict(zip(servers_master_df.loc[renamed, "server_id"], merged_ids[renamed]))
+            servers_master_df = dedupe_records(servers_master_df.assign(identity=merged_ids), key="identity")
+            identity = servers_master_df.pop("identity")
+            servers_master_df["server_id"] = identity.where(identity != "", servers_master_df["server_id"])
+            # Keep one metrics row per merged server, preferring one with a repo
+            github_metrics_df["server_id"] = github_metrics_df["server_id"].replace(new_ids)
+            github_metrics_df = (
+                github_metrics_df.sort_values("has_github", ascending=False, kind="stable")
+                .drop_duplicates("server_id").sort_index().reset_index(drop=True)
+            )
+            print(f"✓ Merged {len(new_ids)} servers with others that declare the same package")
+        if identity_persist:
+            save_identity_index(identity_index)
+
 # Show top by stars
 if "github_stars" in github_metrics_df.columns:
     top_stars = github_metrics_df[github_metrics_df["has_github"] == True].nlargest(10, "github_stars")
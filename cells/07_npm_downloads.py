@@ -8,15 +8,15 @@ def fetch_npm_downloads_range(packages: List[str], start_date: str, end_date: st
     """
     results = {}
 
-    # Process in batches of 128
+    # Process in batches of 128, fetched concurrently
     batch_size = 128
-    for i in range(0, len(packages), batch_size):
-        batch = packages[i:i+batch_size]
-        package_list = ",".join(batch)
-
-        url = f"{NPM_DOWNLOADS_API}/range/{start_date}:{end_date}/{package_list}"
-        response = safe_request(url, delay=NPM_RATE_LIMIT_DELAY)
+    batches = [packages[i:i+batch_size] for i in range(0, len(packages), batch_size)]
+    jobs = [
+        (f"{NPM_DOWNLOADS_API}/range/{start_date}:{end_date}/{','.join(batch)}",)
+        for batch in batches
+    ]
 
+    for response in run_fetches(safe_request, jobs):
         if not response:
             continue
 
@@ -38,15 +38,15 @@ def fetch_npm_downloads_point(packages: List[str], period: str = "last-week") ->
     """Fetch point-in-time download counts (more reliable for totals)."""
     results = {}
 
-    # Process in batches
+    # Process in batches, fetched concurrently
     batch_size = 128
-    for i in range(0, len(packages), batch_size):
-        batch = packages[i:i+batch_size]
-        package_list = ",".join(batch)
-
-        url = f"{NPM_DOWNLOADS_API}/point/{period}/{package_list}"
-        response = safe_request(url, delay=NPM_RATE_LIMIT_DELAY)
+    batches = [packages[i:i+batch_size] for i in range(0, len(packages), batch_size)]
+    jobs = [
+        (f"{NPM_DOWNLOADS_API}/point/{period}/{','.join(batch)}",)
+        for batch in batches
+    ]
 
+    for response in run_fetches(safe_request, jobs):
         if not response:
             continue
 
@@ -76,9 +76,17 @@ for _, row in servers_master_df.iterrows():
     if pd.notna(pkg) and pkg and pkg not in npm_packages:
         npm_packages.append(pkg)
 
+    # Every npm package in the server's full registry record (Cell 2, REGISTRY_FETCH_DETAILS)
+    listed = row.get("packages")
+    if pd.notna(listed) and listed:
+        for entry in listed.split(","):
+            registry, _, name = entry.partition(":")
+            if registry == "npm" and name:
+                npm_packages.append(name)
+
 # Remove duplicates and None values
 npm_packages = [p for p in npm_packages if p and isinstance(p, str)]
-npm_packages = list(set(npm_packages))
+npm_packages = sorted(set(npm_packages))
 
 print(f"Tracking {len(npm_packages)} npm packages")
 print(f"Sample packages: {npm_packages[:10]}")
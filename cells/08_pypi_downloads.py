@@ -1,12 +1,10 @@
 # Cell 8: Fetch PyPI Download Statistics
 # Uses pypistats.org API for download counts (alternative to BigQuery)
 
-PYPISTATS_API = "https://pypistats.org/api"
-
 def fetch_pypi_downloads_recent(package: str) -> Optional[Dict]:
     """Fetch recent download stats from pypistats.org"""
     url = f"{PYPISTATS_API}/packages/{package}/recent"
-    response = safe_request(url, delay=0.5)
+    response = safe_request(url)
 
     if not response or "data" not in response:
         return None
@@ -22,13 +20,41 @@ def fetch_pypi_downloads_overall(package: str, mirrors: bool = True) -> Optional
     """Fetch daily download history from pypistats.org"""
     url = f"{PYPISTATS_API}/packages/{package}/overall"
     params = {"mirrors": str(mirrors).lower()}
-    response = safe_request(url, params=params, delay=0.5)
+    response = safe_request(url, params=params)
 
     if not response or "data" not in response:
         return None
 
     return pd.DataFrame(response["data"])
 
+def fetch_pypi_package_stats(pkg_name: str) -> tuple:
+    """Fetch the recent summary and daily history for one PyPI package."""
+    print(f"  Fetching: {pkg_name}")
+
+    # Get recent summary
+    recent = fetch_pypi_downloads_recent(pkg_name)
+
+    if recent:
+        summary = {
+            "package_name": pkg_name,
+            "package_type": "pypi",
+            "downloads_last_day": recent.get("downloads_last_day", 0),
+            "downloads_last_week": recent.get("downloads_last_week", 0),
+            "downloads_last_month": recent.get("downloads_last_month", 0)
+        }
+    else:
+        summary = {
+            "package_name": pkg_name,
+            "package_type": "pypi",
+            "downloads_last_day": 0,
+            "downloads_last_week": 0,
+            "downloads_last_month": 0
+        }
+
+    # Get daily history
+    daily = fetch_pypi_downloads_overall(pkg_name)
+    return summary, daily
+
 # Collect all PyPI packages to track
 print("Collecting PyPI packages to track...")
 
@@ -43,9 +69,17 @@ for _, row in servers_master_df.iterrows():
     if pd.notna(pkg) and pkg and pkg not in pypi_packages:
         pypi_packages.append(pkg)
 
+    # Every pypi package in the server's full registry record (Cell 2, REGISTRY_FETCH_DETAILS)
+    listed = row.get("packages")
+    if pd.notna(listed) and listed:
+        for entry in listed.split(","):
+            registry, _, name = entry.partition(":")
+            if registry == "pypi" and name:
+                pypi_packages.append(name)
+
 # Remove duplicates
 pypi_packages = [p for p in pypi_packages if p and isinstance(p, str)]
-pypi_packages = list(set(pypi_packages))
+pypi_packages = sorted(set(pypi_packages))
 
 print(f"Tracking {len(pypi_packages)} PyPI packages")
 print(f"Packages: {pypi_packages}")
@@ -56,33 +90,14 @@ print("\nFetching PyPI download statistics...")
 pypi_summary_list = []
 pypi_daily_data = {}
 
-for pkg_name in pypi_packages:
-    print(f"  Fetching: {pkg_name}")
-
-    # Get recent summary
-    recent = fetch_pypi_downloads_recent(pkg_name)
-
-    if recent:
-        summary = {
-            "package_name": pkg_name,
-            "package_type": "pypi",
-            "downloads_last_day": recent.get("downloads_last_day", 0),
-            "downloads_last_week": recent.get("downloads_last_week", 0),
-            "downloads_last_month": recent.get("downloads_last_month", 0)
-        }
-    else:
-        summary = {
-            "package_name": pkg_name,
-            "package_type": "pypi",
-            "downloads_last_day": 0,
-            "downloads_last_week": 0,
-            "downloads_last_month": 0
-        }
-
+# Fetch all packages concurrently (bounded by the per-host limits in Cell 1)
+pypi_jobs = [(pkg_name,) for pkg_name in pypi_packages]
+for (pkg_name,), result in zip(pypi_jobs, run_fetches(fetch_pypi_package_stats, pypi_jobs)):
+    if result is None:
+        continue
+    summary, daily = result
     pypi_summary_list.append(summary)
 
-    # Get daily history
-    daily = fetch_pypi_downloads_overall(pkg_name)
     if daily is not None and len(daily) > 0:
         pypi_daily_data[pkg_name] = daily
 
@@ -113,3 +128,6 @@ if pypi_timeseries_list:
     print(f"\n✓ Created PyPI time series with {len(pypi_timeseries_df)} records")
 else:
     pypi_timeseries_df = pd.DataFrame(columns=["date", "downloads", "package_name"])
+
+# Persist recorded API exchanges (no-op unless HTTP_CASSETTE_MODE = "record")
+save_http_cassette()
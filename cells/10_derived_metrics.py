@@ -19,7 +19,7 @@ def calculate_health_score(row: pd.Series) -> float:
     if pd.notna(row.get("github_pushed_at")):
         try:
             pushed = pd.to_datetime(row["github_pushed_at"])
-            days_since_push = (datetime.now(pushed.tzinfo) - pushed).days
+            days_since_push = (run_now(pushed.tzinfo) - pushed).days
             if days_since_push <= 7:
                 activity_score += 15
             elif days_since_push <= 30:
@@ -77,7 +77,7 @@ def categorize_activity_level(row: pd.Series) -> str:
     if pd.notna(row.get("github_pushed_at")):
         try:
             pushed = pd.to_datetime(row["github_pushed_at"])
-            days_since = (datetime.now(pushed.tzinfo) - pushed).days
+            days_since = (run_now(pushed.tzinfo) - pushed).days
 
             if days_since <= 7:
                 return "Active"
@@ -115,7 +115,7 @@ servers_enriched_df["popularity_tier"] = servers_enriched_df.apply(categorize_po
 # Calculate days since creation
 if "github_created_at" in servers_enriched_df.columns:
     servers_enriched_df["days_since_creation"] = servers_enriched_df["github_created_at"].apply(
-        lambda x: (datetime.now() - pd.to_datetime(x).replace(tzinfo=None)).days
+        lambda x: (run_now() - pd.to_datetime(x).replace(tzinfo=None)).days
         if pd.notna(x) else None
     )
 
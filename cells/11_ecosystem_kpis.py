@@ -4,7 +4,7 @@
 print("Calculating ecosystem KPIs...")
 
 # Current date for snapshot
-snapshot_date = datetime.now().strftime("%Y-%m-%d")
+snapshot_date = RUN_STARTED_AT.strftime("%Y-%m-%d")
 
 # ============================================
 # SERVER COUNT METRICS
@@ -124,6 +124,45 @@ Rate limits:
    - With token: 5,000 requests/hour
 """)
 
+# ============================================
+# HTTP CLIENT STATS
+# ============================================
+
+print("\n🔌 HTTP Client Stats")
+print("-" * 40)
+http_stats_df = http_connection_stats()
+for _, stat in http_stats_df.iterrows():
+    print(f"  • {stat['host']}: {stat['requests']} requests, "
+          f"{stat['connections_opened']} connections opened, {stat['connections_reused']} reused")
+
+print(f"  • Response cache: {http_cache_stats['hits']} hits, {http_cache_stats['misses']} misses, "
+      f"{http_cache_stats['not_modified']} served from 304 Not Modified")
+print(f"  • Retries: {retry_stats['retries']} used of {RETRY_BUDGET} budget, "
+      f"{len(dead_letters)} requests dead-lettered")
+for failed in dead_letters[:10]:
+    print(f"      ✗ {failed['url']} ({failed['reason']})")
+
+print("\n  GitHub quota by token:")
+for _, quota in github_token_pool.quota().iterrows():
+    print(f"  • {quota['token']} [{quota['resource']}]: {quota['remaining']}/{quota['limit']} left "
+          f"(resets {quota['resets_at']}), {quota['requests_sent']} requests sent")
+
+# ============================================
+# HTTP TELEMETRY EXPORT
+# ============================================
+
+print("\n⏱️ HTTP Telemetry (slowest endpoints)")
+print("-" * 40)
+http_telemetry_df = http_telemetry.summary()
+for _, route in http_telemetry_df.head(10).iterrows():
+    print(f"  • {route['host']}{route['route']}: {route['requests']} requests, {route['total_seconds']:.1f}s total, "
+          f"{route['avg_ms']:.0f} ms avg, {route['response_bytes'] / 1024:.0f} KB, "
+          f"{route['retries']} retries, {route['rate_limit_sleep_seconds']:.1f}s rate-limited")
+
+http_telemetry.export_json(HTTP_TELEMETRY_JSON)
+http_telemetry.export_prometheus(HTTP_TELEMETRY_PROM)
+print(f"  Exported: {HTTP_TELEMETRY_JSON}, {HTTP_TELEMETRY_PROM}")
+
 # ============================================
 # DATA FRESHNESS INDICATOR
 # ============================================
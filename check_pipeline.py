@@ -0,0 +1,249 @@
+"""
+Check that faster pipeline code still produces what the code it replaced did.
+
+Runs Cells 1-5 against mock_api_server.py in one shared namespace, as the benchmarks
+do, and compares:
+
+    dedupe      Cell 5 dedupe_records against the original per-group merge_server_records
+                loop, on the merged mock sources
+    repo_urls   Cell 1 parse_repo_url (and its Series form) and Cell 5 normalize_repo_url
+                on URL edge cases
+    identity    Cell 5's persisted identity index across runs: a record whose repository
+                changes splits off again, and ids stay stable otherwise
+
+Usage:
+    python check_pipeline.py                  # 1,000 mock servers
+    python check_pipeline.py --servers 10000
+
+Exits non-zero when any check fails.
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from typing import Dict, List
+
+import pandas as pd
+
+from benchmark_pipeline import _serve_mock_apis, run_cell
+
+# ============================================================================
+# REFERENCE IMPLEMENTATIONS
+# ============================================================================
+
+def merge_server_records(records: List[Dict]) -> Dict:
+    """Cell 5's original merge: first non-null value per field, by source priority."""
+    if len(records) == 1:
+        return records[0]
+
+    merged = {}
+    priority_order = {"curated": 0, "mcp_registry": 1, "github_search": 2}
+    records_sorted = sorted(records, key=lambda x: priority_order.get(x.get("source", ""), 99))
+
+    for key in records[0].keys():
+        for rec in records_sorted:
+            val = rec.get(key)
+            if val is not None and val != "" and str(val) != "nan":
+                merged[key] = val
+                break
+        if key not in merged:
+            merged[key] = None
+
+    sources = list(set(r.get("source", "") for r in records if r.get("source")))
+    merged["sources"] = ",".join(sources)
+    return merged
+
+def reference_dedupe(combined_df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Cell 5's original loop over the groups of `key`; records without a key are kept as they are."""
+    deduped_records = []
+    for value, group in combined_df.groupby(key):
+        if not value:
+            deduped_records.extend(row.to_dict() for _, row in group.iterrows())
+        else:
+            deduped_records.append(merge_server_records(group.to_dict("records")))
+    return pd.DataFrame(deduped_records)
+
+# URL -> expected parse_repo_url result: .git suffixes, scp/ssh forms, GitLab "/-/" paths,
+# *.github.io names, monorepo directory links, and URLs that name no repo on a code forge
+REPO_URL_CASES = {
+    "https://github.com/Owner/Repo.git": ("github.com", "Owner", "Repo", ""),
+    "https://github.com/owner/repo.git/": ("github.com", "owner", "repo", ""),
+    "https://github.com/owner/repo.gitops": ("github.com", "owner", "repo.gitops", ""),
+    "git+https://github.com/owner/repo.git": ("github.com", "owner", "repo", ""),
+    "git@github.com:owner/repo.git": ("github.com", "owner", "repo", ""),
+    "ssh://git@github.com/owner/repo": ("github.com", "owner", "repo", ""),
+    "ssh://git@gitlab.com:2222/group/repo.git": ("gitlab.com", "group", "repo", ""),
+    "https://gitlab.com/group/sub/project/-/tree/main": ("gitlab.com", "group/sub", "project", ""),
+    "https://gitlab.com/group/sub/project/-/tree/main/servers/foo": ("gitlab.com", "group/sub", "project", "servers/foo"),
+    "https://gitlab.com/group/project": ("gitlab.com", "group", "project", ""),
+    "https://github.com/owner/owner.github.io": ("github.com", "owner", "owner.github.io", ""),
+    "https://github.com/owner/site.github.io.git": ("github.com", "owner", "site.github.io", ""),
+    "https://github.com/awslabs/mcp/tree/main/src/aws-docs-mcp-server": ("github.com", "awslabs", "mcp", "src/aws-docs-mcp-server"),
+    "https://github.com/awslabs/mcp/tree/main/src/cdk-mcp-server/": ("github.com", "awslabs", "mcp", "src/cdk-mcp-server"),
+    "https://github.com/awslabs/mcp/tree/main": ("github.com", "awslabs", "mcp", ""),
+    "https://github.com/owner/repo/blob/main/README.md": ("github.com", "owner", "repo", ""),
+    "https://www.github.com/owner/repo?tab=readme#readme": ("github.com", "owner", "repo", ""),
+    "https://bitbucket.org/team/repo/src/main": ("bitbucket.org", "team", "repo", ""),
+    "https://bitbucket.org/team/repo/src/main/servers/bar": ("bitbucket.org", "team", "repo", "servers/bar"),
+    "https://www.npmjs.com/package/@scope/foo": None,
+    "https://pypi.org/project/foo-mcp/": None,
+    "https://example.com/docs/intro": None,
+    "https://github.com/owner": None,
+    "not a url": None,
+    "": None,
+}
+
+# URL -> expected Cell 5 normalize_repo_url key: monorepo directories stay apart, and
+# URLs off the code forges are compared whole rather than by their first two segments
+REPO_KEY_CASES = {
+    "https://github.com/awslabs/mcp/tree/main/src/aws-docs-mcp-server": "github.com/awslabs/mcp/src/aws-docs-mcp-server",
+    "https://github.com/AWSLabs/mcp.git": "github.com/awslabs/mcp",
+    "https://www.npmjs.com/package/@scope/foo": "npmjs.com/package/@scope/foo",
+    "https://www.npmjs.com/package/@scope/bar/": "npmjs.com/package/@scope/bar",
+    "https://example.com/docs/intro?ref=x": "example.com/docs/intro",
+    "http://git.example.org/team/tool.git": "git.example.org/team/tool",
+    "not a url": "",
+    "": "",
+}
+
+# ============================================================================
+# CHECKS
+# ============================================================================
+
+def comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Treat None and NaN alike, and "sources" as an unordered set (the original joined a set)."""
+    df = df.astype(object).where(df.notna(), None)
+    if "sources" in df.columns:
+        df["sources"] = df["sources"].map(lambda s: ",".join(sorted(s.split(","))) if s else s)
+    return df.reset_index(drop=True)
+
+def check_dedupe(ns: Dict) -> List[str]:
+    combined_df = ns["combined_df"].drop(columns=["identity"], errors="ignore")
+    key = "repo_normalized"
+    expected = comparable(reference_dedupe(combined_df, key))
+    actual = comparable(ns["dedupe_records"](combined_df, key=key))
+    merged = int((combined_df[key] != "").sum() - (expected[key] != "").sum())
+    print(f"  dedupe: {len(combined_df):,} records -> {len(actual):,} ({merged:,} merged away)")
+
+    if list(actual.columns) != list(expected.columns):
+        return [f"dedupe: columns {list(actual.columns)} != {list(expected.columns)}"]
+    if len(actual) != len(expected):
+        return [f"dedupe: {len(actual)} rows != {len(expected)} rows"]
+    differs = actual.ne(expected) & ~(actual.isna() & expected.isna())
+    return [
+        f"dedupe: row {row} ({expected.at[row, key]!r}) {column}: {actual.at[row, column]!r} "
+        f"!= {expected.at[row, column]!r}"
+        for row, column in differs.stack()[lambda hit: hit].index[:20]
+    ]
+
+def check_repo_urls(ns: Dict) -> List[str]:
+    parse_repo_url, parse_repo_urls = ns["parse_repo_url"], ns["parse_repo_urls"]
+    problems = [
+        f"repo_urls: {url!r} -> {parse_repo_url(url)!r}, expected {expected!r}"
+        for url, expected in REPO_URL_CASES.items() if parse_repo_url(url) != expected
+    ]
+    # The Series form, with a missing value, must agree with the scalar one
+    urls = pd.Series(list(REPO_URL_CASES) + [None], dtype=object)
+    for url, row in zip(urls, parse_repo_urls(urls).itertuples(index=False)):
+        parsed = tuple(row) if row.host is not None else None
+        if parsed != (parse_repo_url(url) if url is not None else None):
+            problems.append(f"repo_urls: parse_repo_urls gives {parsed!r} for {url!r}")
+    normalize_repo_url = ns["normalize_repo_url"]
+    problems += [
+        f"repo_urls: {url!r} -> key {normalize_repo_url(url)!r}, expected {expected!r}"
+        for url, expected in REPO_KEY_CASES.items() if normalize_repo_url(url) != expected
+    ]
+    print(f"  repo_urls: {len(REPO_URL_CASES) + len(REPO_KEY_CASES)} cases")
+    return problems
+
+def identity_records(repo_a: str) -> pd.DataFrame:
+    """Three records: A (registry) and B (search) share a repo until A's repository changes."""
+    return pd.DataFrame({
+        "server_id": ["io.mock/a", "github_1", "io.mock/c"],
+        "source": ["mcp_registry", "github_search", "mcp_registry"],
+        "repo_normalized": [repo_a, "github.com/o/shared", "github.com/o/c"],
+        "npm_package": [None, "shared-guess", "c-mcp"],
+        "pypi_package": [None, None, None],
+        "npm_package_origin": [None, "guess", "declared"],
+        "pypi_package_origin": [None, None, None],
+        "packages": [None, None, None],
+    })
+
+def check_identity(ns: Dict) -> List[str]:
+    problems = []
+    path = ns["IDENTITY_INDEX_PATH"]
+    ns["IDENTITY_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "index.json.gz")
+    try:
+        def run(repo_a: str, full_sync: bool = False) -> List[str]:
+            index = ns["load_identity_index"]()
+            ids = ns["assign_identities"](identity_records(repo_a), index, full_sync=full_sync).tolist()
+            ns["save_identity_index"](index)
+            return ids
+
+        first = run("github.com/o/shared", full_sync=True)
+        if first[0] != first[1] or first[0] == first[2]:
+            problems.append(f"identity: run 1 ids {first}, expected A and B merged and C apart")
+        # A moves to its own repo in an incremental run: the link it asserted is replaced
+        second = run("github.com/o/a-new")
+        if second[0] == second[1] or first[0] not in second[:2] or second[2] != first[2]:
+            problems.append(f"identity: run 2 ids {second} after A's repo changed (run 1: {first})")
+        third = run("github.com/o/a-new", full_sync=True)
+        if third != second:
+            problems.append(f"identity: run 3 ids {third} differ from run 2 {second}")
+
+        # Changed key derivation drops the stored links but keeps the ids
+        with gzip.open(ns["IDENTITY_INDEX_PATH"], "rt", encoding="utf-8") as f:
+            state = json.load(f)
+        with gzip.open(ns["IDENTITY_INDEX_PATH"], "wt", encoding="utf-8") as f:
+            json.dump({**state, "keys_version": -1}, f)
+        index = ns["load_identity_index"]()
+        if index.links or index.key_ids != state["key_ids"]:
+            problems.append("identity: a changed keys_version kept the links or lost the ids")
+    finally:
+        ns["IDENTITY_INDEX_PATH"] = path
+    print("  identity: 3 runs with a changed repository")
+    return problems
+
+def run_checks(size: int) -> List[str]:
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_mock_apis, args=(size, queue), daemon=True)
+    server.start()
+    os.environ.update(queue.get(timeout=600))
+    ns = {"display": lambda *args, **kwargs: None, "__name__": "__main__"}
+
+    try:
+        run_cell(ns, "01_config_and_imports")
+        ns["HOST_RATE_LIMITS"].clear()
+        ns["HTTP_CACHE_ENABLED"] = False
+        ns["REGISTRY_INCREMENTAL"] = False
+        ns["GITHUB_DISCOVERY_INCREMENTAL"] = False
+        ns["IDENTITY_INDEX_PATH"] = None
+        ns["REGISTRY_MAX_PAGES"] = size // 100 + 1
+        for cell in ["02_fetch_mcp_registry", "03_github_discovery", "04_curated_servers", "05_merge_and_dedupe"]:
+            run_cell(ns, cell)
+    finally:
+        server.terminate()
+        server.join()
+
+    return check_dedupe(ns) + check_repo_urls(ns) + check_identity(ns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pipeline code with the implementations it replaced.")
+    parser.add_argument("--servers", type=int, default=1000, help="mock ecosystem size")
+    args = parser.parse_args()
+
+    print(f"Checking against {args.servers:,} mock servers...")
+    problems = run_checks(args.servers)
+    if problems:
+        print("\n⚠ Mismatches:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("✓ All checks passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,760 @@
+"""
+Local mock of the APIs the dashboard cells call, for load testing and offline development.
+
+Serves a synthetic, deterministic MCP ecosystem (10k-500k servers) through four
+listeners on consecutive ports, one per upstream API:
+
+    port      MCP Registry   /v0/servers, /v0/servers/{id}
+    port + 1  GitHub         /search/repositories, /repos/{o}/{r}, /stats/commit_activity,
+                             /contributors, /graphql, /rate_limit
+    port + 2  npm            /downloads/point/..., /downloads/range/... (single and bulk)
+    port + 3  pypistats      /api/packages/{pkg}/recent, /api/packages/{pkg}/overall
+
+GitHub endpoints enforce per-token primary rate limits and send X-RateLimit-*
+headers. Latency, 5xx errors, 429s, secondary rate limits and 202 "stats pending"
+responses can be injected. GET responses carry ETags and answer If-None-Match with 304.
+
+Usage:
+    python mock_api_server.py --servers 50000 --port 8700 --latency-ms 40 --error-rate 0.01
+
+then export the printed base URLs before running the cells, e.g.
+    MCP_REGISTRY_BASE=http://127.0.0.1:8700/v0
+    GITHUB_API_BASE=http://127.0.0.1:8701
+    NPM_DOWNLOADS_API=http://127.0.0.1:8702/downloads
+    PYPISTATS_API=http://127.0.0.1:8703/api
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+# ============================================================================
+# SYNTHETIC ECOSYSTEM
+# ============================================================================
+
+# MCP was announced on 2024-11-25; synthetic repos are created between then and `today`
+ECOSYSTEM_START = datetime(2024, 11, 25, tzinfo=timezone.utc)
+
+LANGUAGES = [("TypeScript", 0.5), ("Python", 0.35), ("Go", 0.1), ("Rust", 0.05)]
+CATEGORIES = ["database", "devtools", "search", "cloud", "productivity", "ai", "finance", "monitoring"]
+LICENSES = ["MIT", "Apache-2.0", "GPL-3.0", None]
+SEARCH_RESULT_CAP = 1000
+
+class SyntheticEcosystem:
+    """
+    A deterministic fake ecosystem: server i always has the same repo, packages and metrics.
+
+    Records are derived on demand from (seed, i); only the columns search needs are precomputed.
+    """
+
+    def __init__(self, size: int, seed: int = 0, today: Optional[date] = None):
+        self.size = size
+        self.seed = seed
+        self.owners = max(1, size // 20)
+        today = today or datetime.now(timezone.utc).date()
+        self.now = datetime(today.year, today.month, today.day, tzinfo=timezone.utc)
+        self._span = max(1, int((self.now - ECOSYSTEM_START).total_seconds()))
+        self._search_index = None
+        self._lock = threading.Lock()
+
+    def _rng(self, i: int, salt: str = "") -> random.Random:
+        return random.Random(f"{self.seed}:{i}:{salt}")
+
+    def server(self, i: int) -> Dict:
+        """The core attributes of server i."""
+        rng = self._rng(i)
+        roll = rng.random()
+        host = "github" if roll < 0.8 else ("gitlab" if roll < 0.85 else None)
+        language = rng.choices([l for l, _ in LANGUAGES], [w for _, w in LANGUAGES])[0]
+        created = ECOSYSTEM_START + timedelta(seconds=int(rng.random() * self._span))
+        pushed = created + timedelta(seconds=int(rng.random() * (self.now - created).total_seconds()))
+        owner = f"org-{i % self.owners}"
+        name = f"mcp-server-{i}"
+        categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+        topics = ["mcp"] + (["model-context-protocol"] if rng.random() < 0.5 else []) + categories
+        return {
+            "index": i,
+            "owner": owner,
+            "name": name,
+            "host": host,
+            "language": language,
+            "npm_package": name if language == "TypeScript" else None,
+            "pypi_package": name if language == "Python" else None,
+            "categories": categories,
+            "topics": topics,
+            "stars": int(rng.paretovariate(1.1) * 5) - 5,
+            "forks": int(rng.paretovariate(1.3) * 2) - 2,
+            "open_issues": rng.randint(0, 40),
+            "contributors": int(rng.paretovariate(1.5)),
+            "size_kb": rng.randint(20, 50000),
+            "license": rng.choice(LICENSES),
+            "archived": rng.random() < 0.03,
+            "created": created,
+            "pushed": pushed,
+            "repo_id": 100000000 + i,
+        }
+
+    def repo_index(self, owner: str, name: str) -> Optional[int]:
+        """Index of the GitHub-hosted server owner/name, or None if it does not exist."""
+        match = re.fullmatch(r"mcp-server-(\d+)", name.lower())
+        if not match:
+            return None
+        i = int(match.group(1))
+        if i >= self.size or f"org-{i % self.owners}" != owner.lower():
+            return None
+        return i if self.server(i)["host"] == "github" else None
+
+    def repo_url(self, s: Dict) -> str:
+        if s["host"] is None:
+            return ""
+        return f"https://{s['host']}.com/{s['owner']}/{s['name']}"
+
+    def registry_entry(self, i: int) -> Dict:
+        s = self.server(i)
+        return {
+            "id": f"io.mock/{s['owner']}/{s['name']}",
+            "name": s["name"],
+            "description": f"Synthetic MCP server #{i} for {', '.join(s['categories'])}",
+            "repository": {"url": self.repo_url(s), "source": s["host"] or ""},
+            # The list endpoint's package field is thin; every third entry has none
+            "package": {"npm": s["npm_package"], "pypi": s["pypi_package"]} if i % 3 else None,
+            "categories": s["categories"],
+            "author": s["owner"],
+            "version": f"0.{i % 10}.{i % 7}",
+            "_meta": {"io.modelcontextprotocol.registry/official": {
+                "publishedAt": _iso(s["created"]),
+                "updatedAt": _iso(s["pushed"]),
+            }},
+        }
+
+    def registry_detail(self, i: int) -> Dict:
+        """Full registry record, shaped like GET /v0/servers/{id}, with its packages array."""
+        s = self.server(i)
+        entry = self.registry_entry(i)
+        packages = []
+        if s["npm_package"]:
+            packages.append({"registryType": "npm", "identifier": s["npm_package"], "version": entry["version"]})
+        if s["pypi_package"]:
+            packages.append({"registryType": "pypi", "identifier": s["pypi_package"], "version": entry["version"]})
+        if i % 5 == 0:
+            packages.append({"registryType": "oci", "identifier": f"docker.io/{s['owner']}/{s['name']}",
+                             "version": entry["version"]})
+        meta = entry.pop("_meta")
+        entry.pop("package")
+        entry["packages"] = packages
+        return {"server": entry, "_meta": meta}
+
+    def repo(self, i: int) -> Dict:
+        """REST repository payload, shaped like GET /repos/{owner}/{repo}."""
+        s = self.server(i)
+        full_name = f"{s['owner']}/{s['name']}"
+        return {
+            "id": s["repo_id"],
+            "name": s["name"],
+            "full_name": full_name,
+            "owner": {"login": s["owner"], "type": "Organization"},
+            "html_url": self.repo_url(s),
+            "description": f"Synthetic MCP server #{i}",
+            "stargazers_count": s["stars"],
+            "watchers_count": s["stars"],
+            "forks_count": s["forks"],
+            "open_issues_count": s["open_issues"],
+            "size": s["size_kb"],
+            "language": s["language"],
+            "license": {"spdx_id": s["license"]} if s["license"] else None,
+            "default_branch": "main",
+            "created_at": _iso(s["created"]),
+            "updated_at": _iso(s["pushed"]),
+            "pushed_at": _iso(s["pushed"]),
+            "archived": s["archived"],
+            "disabled": False,
+            "topics": s["topics"],
+        }
+
+    def head_sha(self, i: int) -> str:
+        """Default-branch head commit; changes whenever the repo is pushed."""
+        return hashlib.sha1(f"{self.seed}:{i}:{_iso(self.server(i)['pushed'])}".encode()).hexdigest()
+
+    def manifests(self, i: int) -> Dict:
+        """package.json / pyproject.toml / setup.py blobs, as object(expression:) GraphQL fields."""
+        s = self.server(i)
+        blobs = {"packageJson": None, "pyprojectToml": None, "setupPy": None}
+        if s["npm_package"]:
+            manifest = {"name": s["npm_package"], "version": "1.0.0"}
+            if i % 6 == 0:
+                # A workspace root that is never published
+                manifest = {"name": f"{s['name']}-workspace", "private": True}
+            blobs["packageJson"] = {"text": json.dumps(manifest, indent=2)}
+        if s["pypi_package"]:
+            if i % 4 == 0:
+                blobs["setupPy"] = {"text": f"from setuptools import setup\n\nsetup(\n    name='{s['pypi_package']}',\n)\n"}
+            else:
+                blobs["pyprojectToml"] = {"text": f"[build-system]\nrequires = [\"hatchling\"]\n\n"
+                                                  f"[project]\nname = \"{s['pypi_package']}\"\nversion = \"1.0.0\"\n"}
+        return blobs
+
+    def commit_weeks(self, i: int) -> List[Dict]:
+        """52 weeks of commit counts, shaped like /stats/commit_activity."""
+        s = self.server(i)
+        rng = self._rng(i, "commits")
+        week_start = self.now - timedelta(days=self.now.weekday() + 1)
+        weeks = []
+        for w in range(51, -1, -1):
+            start = week_start - timedelta(weeks=w)
+            active = s["created"] <= start + timedelta(days=7) and start <= s["pushed"]
+            days = [rng.randint(0, 3) if active and rng.random() < 0.4 else 0 for _ in range(7)]
+            weeks.append({"days": days, "total": sum(days), "week": int(start.timestamp())})
+        return weeks
+
+    def downloads(self, package: str, day: date) -> int:
+        """Daily downloads of a synthetic package (0 before the repo existed)."""
+        match = re.fullmatch(r"mcp-server-(\d+)", package)
+        if package == "mcp" or package == "@modelcontextprotocol/sdk":
+            base, created = 200000, ECOSYSTEM_START.date()
+        elif match and int(match.group(1)) < self.size:
+            s = self.server(int(match.group(1)))
+            base, created = 5 + s["stars"] * 3, s["created"].date()
+        else:
+            return 0
+        if day < created or day > self.now.date():
+            return 0
+        noise = int(hashlib.md5(f"{self.seed}:{package}:{day}".encode()).hexdigest()[:4], 16) / 65535
+        return int(base * (0.5 + noise))
+
+    def search_index(self) -> Dict[str, list]:
+        """Precomputed search columns for GitHub-hosted repos, sorted by stars descending."""
+        with self._lock:
+            if self._search_index is None:
+                rows = []
+                for i in range(self.size):
+                    s = self.server(i)
+                    if s["host"] == "github":
+                        rows.append((s["stars"], i, s["created"].timestamp(), s["pushed"].timestamp(),
+                                     frozenset(s["topics"])))
+                rows.sort(key=lambda r: (-r[0], r[1]))
+                self._search_index = {
+                    "stars": [r[0] for r in rows],
+                    "index": [r[1] for r in rows],
+                    "created": [r[2] for r in rows],
+                    "pushed": [r[3] for r in rows],
+                    "topics": [r[4] for r in rows],
+                }
+            return self._search_index
+
+    def search(self, q: str, sort: str = "stars", order: str = "desc") -> List[int]:
+        """Server indexes matching a search query; honours topic:, created:, pushed: and stars:."""
+        idx = self.search_index()
+        filters = []
+        for field, value in re.findall(r"(topic|created|pushed|stars):(\S+)", q):
+            if field == "topic":
+                filters.append(lambda r, v=value: v in idx["topics"][r])
+            else:
+                low, high = _parse_range(value, numeric=field == "stars")
+                filters.append(lambda r, c=idx[field], lo=low, hi=high: lo <= c[r] <= hi)
+
+        rows = [r for r in range(len(idx["index"])) if all(f(r) for f in filters)]
+        if sort == "updated":
+            rows.sort(key=lambda r: idx["pushed"][r], reverse=order != "asc")
+        elif order == "asc":
+            rows.reverse()
+        return [idx["index"][r] for r in rows]
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _parse_bound(value: str, numeric: bool, upper: bool) -> float:
+    if value == "*":
+        return float("inf") if upper else float("-inf")
+    if numeric:
+        return float(value)
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    if upper and len(value) == 10:
+        # A bare date is inclusive of the whole day
+        dt += timedelta(days=1, microseconds=-1)
+    return dt.timestamp()
+
+def _parse_range(value: str, numeric: bool) -> tuple:
+    """Parse GitHub range syntax (a..b, >a, >=a, <a, <=a, a) into inclusive (low, high)."""
+    step = 1 if numeric else 1e-6
+    if ".." in value:
+        low, high = value.split("..", 1)
+        return _parse_bound(low, numeric, False), _parse_bound(high, numeric, True)
+    for prefix in (">=", "<=", ">", "<"):
+        if value.startswith(prefix):
+            upper = prefix.startswith("<")
+            bound = _parse_bound(value[len(prefix):], numeric, upper if "=" in prefix else not upper)
+            if prefix == ">":
+                return bound + step, float("inf")
+            if prefix == "<":
+                return float("-inf"), bound - step
+            return (bound, float("inf")) if prefix == ">=" else (float("-inf"), bound)
+    return _parse_bound(value, numeric, False), _parse_bound(value, numeric, True)
+
+# ============================================================================
+# RATE LIMITS AND FAULT INJECTION
+# ============================================================================
+
+class MockOptions:
+    """Knobs for latency, errors and GitHub rate limits."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 throttle_rate: float = 0, secondary_rate: float = 0, stats_pending_rate: float = 0.3,
+                 core_limit: int = 5000, search_limit: int = 30, graphql_limit: int = 5000,
+                 anonymous_core_limit: int = 60, anonymous_search_limit: int = 10,
+                 window: int = 3600, search_window: int = 60, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.secondary_rate = secondary_rate
+        self.stats_pending_rate = stats_pending_rate
+        self.limits = {
+            ("token", "core"): (core_limit, window),
+            ("token", "search"): (search_limit, search_window),
+            ("token", "graphql"): (graphql_limit, window),
+            ("anonymous", "core"): (anonymous_core_limit, window),
+            ("anonymous", "search"): (anonymous_search_limit, search_window),
+            ("anonymous", "graphql"): (0, window),
+        }
+        self.rng = random.Random(seed)
+
+class GitHubRateLimiter:
+    """Fixed-window primary rate limits per (token or client address, resource)."""
+
+    def __init__(self, options: MockOptions):
+        self.options = options
+        self.windows: Dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def _window(self, identity: str, resource: str) -> list:
+        kind = "anonymous" if identity.startswith("ip:") else "token"
+        limit, length = self.options.limits[(kind, resource)]
+        now = time.time()
+        window = self.windows.get((identity, resource))
+        if window is None or now >= window[2]:
+            window = [limit, 0, int(now) + length]
+            self.windows[(identity, resource)] = window
+        return window
+
+    def consume(self, identity: str, resource: str, charge: bool = True) -> tuple:
+        """Charge one request; returns (allowed, headers)."""
+        with self.lock:
+            window = self._window(identity, resource)
+            limit, used, reset = window
+            allowed = used < limit
+            if allowed and charge:
+                window[1] = used = used + 1
+        return allowed, {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(0, limit - used)),
+            "X-RateLimit-Used": str(used),
+            "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Resource": resource,
+        }
+
+    def status(self, identity: str) -> Dict:
+        with self.lock:
+            resources = {}
+            for resource in ("core", "search", "graphql"):
+                limit, used, reset = self._window(identity, resource)
+                resources[resource] = {"limit": limit, "used": used, "remaining": limit - used, "reset": reset}
+        return {"resources": resources, "rate": resources["core"]}
+
+# ============================================================================
+# HTTP HANDLERS
+# ============================================================================
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Shared plumbing: latency, fault injection, ETags and JSON responses."""
+
+    protocol_version = "HTTP/1.1"
+    ecosystem: SyntheticEcosystem = None
+    options: MockOptions = None
+    base_url = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        parsed = urlparse(self.path)
+        self.route_path = parsed.path.rstrip("/")
+        self.query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+        opts = self.options
+        delay = opts.latency_ms + opts.rng.uniform(0, opts.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if opts.rng.random() < opts.error_rate:
+            return self.send_json({"message": "Server Error"}, status=502)
+        if opts.rng.random() < opts.throttle_rate:
+            return self.send_json({"message": "Too Many Requests"}, status=429, headers={"Retry-After": "1"})
+
+        try:
+            self.route(method)
+        except (ValueError, KeyError) as e:
+            self.send_json({"message": f"Bad request: {e}"}, status=400)
+
+    def route(self, method: str):
+        raise NotImplementedError
+
+    def send_json(self, payload, status: int = 200, headers: Dict = None, etag: bool = True):
+        body = json.dumps(payload).encode()
+        headers = dict(headers or {})
+        if etag and status == 200 and self.command == "GET":
+            tag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+            headers["ETag"] = tag
+            if self.headers.get("If-None-Match") == tag:
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def not_found(self):
+        self.send_json({"message": "Not Found"}, status=404, etag=False)
+
+class RegistryHandler(MockHandler):
+    """MCP Registry: GET /v0/servers?limit=&cursor=&updated_since= with an opaque next_cursor, and GET /v0/servers/{id}."""
+
+    def route(self, method: str):
+        if self.route_path.startswith("/v0/servers/"):
+            return self.detail(unquote(self.route_path[len("/v0/servers/"):]))
+        if self.route_path != "/v0/servers":
+            return self.not_found()
+        limit = min(int(self.query.get("limit", 30)), 100)
+        cursor = self.query.get("cursor")
+        position = int(cursor.split(":", 1)[1]) if cursor else 0
+        since = self.query.get("updated_since")
+        since = _parse_bound(since, numeric=False, upper=False) if since else None
+
+        servers = []
+        while position < self.ecosystem.size and len(servers) < limit:
+            if since is None or self.ecosystem.server(position)["pushed"].timestamp() > since:
+                servers.append(self.ecosystem.registry_entry(position))
+            position += 1
+        payload = {
+            "servers": servers,
+            "next_cursor": f"offset:{position}" if position < self.ecosystem.size else None,
+        }
+        self.send_json(payload)
+
+    def detail(self, server_id: str):
+        match = re.search(r"mcp-server-(\d+)$", server_id)
+        i = int(match.group(1)) if match else None
+        if i is None or i >= self.ecosystem.size or self.ecosystem.registry_entry(i)["id"] != server_id:
+            return self.not_found()
+        self.send_json(self.ecosystem.registry_detail(i))
+
+class GitHubHandler(MockHandler):
+    """GitHub REST and GraphQL endpoints used by Cells 3 and 6, behind per-token rate limits."""
+
+    limiter: GitHubRateLimiter = None
+    stats_ready: set = None
+
+    def route(self, method: str):
+        auth = self.headers.get("Authorization", "")
+        identity = auth.split(" ", 1)[-1] if auth else f"ip:{self.client_address[0]}"
+        path = self.route_path
+
+        if path == "/rate_limit":
+            return self.send_json(self.limiter.status(identity), etag=False)
+
+        resource = "search" if path.startswith("/search/") else "graphql" if path == "/graphql" else "core"
+        # Conditional requests are charged in send_json, and only if they are not answered 304
+        conditional = self.headers.get("If-None-Match") is not None
+        self.pending_charge = (identity, resource) if conditional else None
+        allowed, headers = self.limiter.consume(identity, resource, charge=not conditional)
+        if not allowed:
+            headers["Retry-After"] = str(max(0, int(headers["X-RateLimit-Reset"]) - int(time.time())))
+            return self.send_json({"message": "API rate limit exceeded"}, status=403, headers=headers, etag=False)
+        if self.options.rng.random() < self.options.secondary_rate:
+            headers["Retry-After"] = "1"
+            return self.send_json({"message": "You have exceeded a secondary rate limit."},
+                                  status=403, headers=headers, etag=False)
+
+        if path == "/graphql" and method == "POST":
+            return self.graphql(headers)
+        if path == "/search/repositories":
+            return self.search(headers)
+
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)(/stats/commit_activity|/contributors)?", path)
+        i = self.ecosystem.repo_index(match.group(1), match.group(2)) if match else None
+        if i is None:
+            return self.send_json({"message": "Not Found"}, status=404, headers=headers, etag=False)
+
+        if match.group(3) == "/stats/commit_activity":
+            if i not in self.stats_ready:
+                self.stats_ready.add(i)
+                if self.options.rng.random() < self.options.stats_pending_rate:
+                    return self.send_json({}, status=202, headers=headers, etag=False)
+            return self.send_json(self.ecosystem.commit_weeks(i), headers=headers)
+        if match.group(3) == "/contributors":
+            return self.contributors(i, headers)
+        self.send_json(self.ecosystem.repo(i), headers=headers)
+
+    def send_json(self, payload, status: int = 200, headers: Dict = None, etag: bool = True):
+        sent = super().send_json(payload, status, headers, etag)
+        if getattr(self, "pending_charge", None) and sent != 304:
+            self.limiter.consume(*self.pending_charge)
+        self.pending_charge = None
+
+    def search(self, headers: Dict):
+        per_page = min(int(self.query.get("per_page", 30)), 100)
+        page = int(self.query.get("page", 1))
+        if (page - 1) * per_page >= SEARCH_RESULT_CAP:
+            return self.send_json({"message": "Only the first 1000 search results are available"},
+                                  status=422, headers=headers, etag=False)
+        matches = self.ecosystem.search(self.query.get("q", ""), self.query.get("sort", "stars"),
+                                        self.query.get("order", "desc"))
+        window = matches[:SEARCH_RESULT_CAP][(page - 1) * per_page:page * per_page]
+        self.send_json({
+            "total_count": len(matches),
+            "incomplete_results": False,
+            "items": [self.ecosystem.repo(i) for i in window],
+        }, headers=headers)
+
+    def contributors(self, i: int, headers: Dict):
+        count = self.ecosystem.server(i)["contributors"]
+        per_page = min(int(self.query.get("per_page", 30)), 100)
+        page = int(self.query.get("page", 1))
+        last = max(1, -(-count // per_page))
+        start = (page - 1) * per_page
+        items = [{"login": f"user-{i}-{n}", "contributions": count - n}
+                 for n in range(start, min(start + per_page, count))]
+        if last > 1:
+            url = f"{self.base_url}/repos/{self.ecosystem.repo(i)['full_name']}/contributors"
+            query = {k: v for k, v in self.query.items() if k != "page"}
+            links = []
+            if page < last:
+                links.append(f'<{url}?{urlencode({**query, "page": page + 1})}>; rel="next"')
+            links.append(f'<{url}?{urlencode({**query, "page": last})}>; rel="last"')
+            headers["Link"] = ", ".join(links)
+        self.send_json(items, headers=headers)
+
+    def graphql(self, headers: Dict):
+        """Answer aliased repository(owner:, name:) lookups for the fragments Cell 6 queries."""
+        request = json.loads(self.body or b"{}")
+        query, variables = request.get("query", ""), request.get("variables") or {}
+        data, errors = {}, []
+        pattern = r"(\w+): repository\(owner: \$(\w+), name: \$(\w+)\)"
+        for alias, owner_var, name_var in re.findall(pattern, query):
+            owner, name = variables.get(owner_var, ""), variables.get(name_var, "")
+            i = self.ecosystem.repo_index(owner, name)
+            if i is None:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias],
+                               "message": f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+                continue
+            data[alias] = self.graphql_repo(i, query)
+        payload = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        self.send_json(payload, headers=headers, etag=False)
+
+    def graphql_repo(self, i: int, query: str) -> Dict:
+        s = self.ecosystem.server(i)
+        node = {}
+        if "fragment RepoMetrics" in query:
+            node.update({
+                "stargazerCount": s["stars"],
+                "forkCount": s["forks"],
+                "watchers": {"totalCount": s["stars"]},
+                "issues": {"totalCount": s["open_issues"] // 2},
+                "pullRequests": {"totalCount": s["open_issues"] - s["open_issues"] // 2},
+                "diskUsage": s["size_kb"],
+                "primaryLanguage": {"name": s["language"]},
+                "licenseInfo": {"spdxId": s["license"]} if s["license"] else None,
+                "defaultBranchRef": {"name": "main"},
+                "createdAt": _iso(s["created"]),
+                "updatedAt": _iso(s["pushed"]),
+                "pushedAt": _iso(s["pushed"]),
+                "isArchived": s["archived"],
+                "isDisabled": False,
+                "repositoryTopics": {"nodes": [{"topic": {"name": t}} for t in s["topics"]]},
+                "mentionableUsers": {"totalCount": s["contributors"]},
+            })
+        if "fragment SearchGaps" in query:
+            node.update({
+                "watchers": {"totalCount": s["stars"]},
+                "licenseInfo": {"spdxId": s["license"]} if s["license"] else None,
+                "pushedAt": _iso(s["pushed"]),
+                "isArchived": s["archived"],
+                "mentionableUsers": {"totalCount": s["contributors"]},
+            })
+        if "fragment Manifests" in query:
+            node.update(self.ecosystem.manifests(i))
+        if "fragment CommitWindows" in query:
+            weeks = self.ecosystem.commit_weeks(i)
+            target = {
+                "oid": self.ecosystem.head_sha(i),
+                "commitsLastWeek": {"totalCount": weeks[-1]["total"]},
+                "commitsLast4Weeks": {"totalCount": sum(w["total"] for w in weeks[-4:])},
+            }
+            node["defaultBranchRef"] = {**node.get("defaultBranchRef", {"name": "main"}), "target": target}
+        return node
+
+class NpmHandler(MockHandler):
+    """npm downloads: /downloads/point/{period}/{pkgs} and /downloads/range/{start}:{end}/{pkgs}."""
+
+    PERIODS = {"last-day": 1, "last-week": 7, "last-month": 30}
+
+    def route(self, method: str):
+        match = re.fullmatch(r"/downloads/(point|range)/([^/]+)/(.+)", self.route_path)
+        if not match:
+            return self.not_found()
+        kind, period, packages = match.groups()
+        today = self.ecosystem.now.date()
+        if period in self.PERIODS:
+            start, end = today - timedelta(days=self.PERIODS[period] - 1), today
+        else:
+            start, end = (date.fromisoformat(d) for d in period.split(":", 1))
+
+        days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+        names = packages.split(",")
+        results = {}
+        for name in names:
+            daily = [{"day": d.isoformat(), "downloads": self.ecosystem.downloads(name, d)} for d in days]
+            entry = {"start": start.isoformat(), "end": end.isoformat(), "package": name}
+            if kind == "point":
+                entry["downloads"] = sum(d["downloads"] for d in daily)
+            else:
+                entry["downloads"] = daily
+            results[name] = entry if any(d["downloads"] for d in daily) else None
+
+        if len(names) == 1:
+            if results[names[0]] is None:
+                return self.send_json({"error": f"package {names[0]} not found"}, status=404, etag=False)
+            return self.send_json(results[names[0]])
+        self.send_json(results)
+
+class PypistatsHandler(MockHandler):
+    """pypistats: /api/packages/{pkg}/recent and /api/packages/{pkg}/overall?mirrors=."""
+
+    def route(self, method: str):
+        match = re.fullmatch(r"/api/packages/([^/]+)/(recent|overall)", self.route_path)
+        if not match:
+            return self.not_found()
+        package, kind = match.groups()
+        today = self.ecosystem.now.date()
+        history = [(today - timedelta(days=n), self.ecosystem.downloads(package, today - timedelta(days=n)))
+                   for n in range(180, 0, -1)]
+        if not any(count for _, count in history):
+            return self.send_json({"message": "Not Found"}, status=404, etag=False)
+
+        if kind == "recent":
+            data = {
+                "last_day": history[-1][1],
+                "last_week": sum(c for _, c in history[-7:]),
+                "last_month": sum(c for _, c in history[-30:]),
+            }
+        else:
+            categories = ["with_mirrors", "without_mirrors"] if self.query.get("mirrors", "true") != "false" \
+                else ["without_mirrors"]
+            data = [
+                {"category": category, "date": day.isoformat(),
+                 "downloads": count if category == "with_mirrors" else int(count * 0.9)}
+                for category in categories for day, count in history
+            ]
+        self.send_json({"data": data, "package": package, "type": f"{kind}_downloads"})
+
+# ============================================================================
+# SERVER LIFECYCLE
+# ============================================================================
+
+def start_mock_servers(size: int = 10000, port: int = 8700, host: str = "127.0.0.1",
+                       options: Optional[MockOptions] = None, seed: int = 0,
+                       today: Optional[date] = None) -> tuple:
+    """
+    Start the four mock APIs on background threads.
+
+    Returns (servers, env) where env maps MCP_REGISTRY_BASE / GITHUB_API_BASE /
+    NPM_DOWNLOADS_API / PYPISTATS_API to the mock base URLs. Pass port=0 to pick free ports.
+    Call stop_mock_servers(servers) when done.
+    """
+    ecosystem = SyntheticEcosystem(size, seed=seed, today=today)
+    options = options or MockOptions(seed=seed)
+    shared = {"ecosystem": ecosystem, "options": options}
+    apis = [
+        ("MCP_REGISTRY_BASE", RegistryHandler, "/v0"),
+        ("GITHUB_API_BASE", GitHubHandler, ""),
+        ("NPM_DOWNLOADS_API", NpmHandler, "/downloads"),
+        ("PYPISTATS_API", PypistatsHandler, "/api"),
+    ]
+    limiter, stats_ready = GitHubRateLimiter(options), set()
+
+    servers, env = [], {}
+    for offset, (var, handler, prefix) in enumerate(apis):
+        attrs = dict(shared, limiter=limiter, stats_ready=stats_ready)
+        server = ThreadingHTTPServer((host, port + offset if port else 0), type(handler.__name__, (handler,), attrs))
+        server.daemon_threads = True
+        base = f"http://{host}:{server.server_address[1]}"
+        server.RequestHandlerClass.base_url = base
+        env[var] = base + prefix
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers, env
+
+def stop_mock_servers(servers: List[ThreadingHTTPServer]):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock MCP Registry / GitHub / npm / pypistats APIs.")
+    parser.add_argument("--servers", type=int, default=10000, help="synthetic ecosystem size")
+    parser.add_argument("--port", type=int, default=8700, help="first of four consecutive ports")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date.fromisoformat, default=None, help="pin the ecosystem date (YYYY-MM-DD)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra latency, 0..jitter")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered 502")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="fraction answered 429 + Retry-After")
+    parser.add_argument("--secondary-rate", type=float, default=0, help="fraction of GitHub calls hit by a secondary limit")
+    parser.add_argument("--stats-pending-rate", type=float, default=0.3, help="chance a repo's first commit_activity is 202")
+    parser.add_argument("--core-limit", type=int, default=5000, help="GitHub core requests per window per token")
+    parser.add_argument("--search-limit", type=int, default=30, help="GitHub search requests per minute per token")
+    parser.add_argument("--graphql-limit", type=int, default=5000, help="GitHub GraphQL queries per window per token")
+    parser.add_argument("--window", type=int, default=3600, help="core/graphql rate-limit window in seconds")
+    args = parser.parse_args()
+
+    options = MockOptions(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, secondary_rate=args.secondary_rate,
+        stats_pending_rate=args.stats_pending_rate, core_limit=args.core_limit,
+        search_limit=args.search_limit, graphql_limit=args.graphql_limit, window=args.window, seed=args.seed,
+    )
+    servers, env = start_mock_servers(args.servers, args.port, args.host, options, args.seed, args.today)
+    print(f"✓ Mock APIs serving {args.servers:,} synthetic servers")
+    for var, url in env.items():
+        print(f"  {var}={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_mock_servers(servers)
+
+if __name__ == "__main__":
+    main()